@@ -0,0 +1,105 @@
+import pandas as pd
+
+from importers import CARD_CATEGORY
+from processing import expand_transactions_for_year, transactions_frame
+
+_KEYS = ['mes', 'tipo', 'categoria', 'subcategoria']
+
+
+def _cells(df_display: pd.DataFrame) -> dict:
+    # {(mes, tipo, categoria, subcategoria): [total, quantidade]}; chaves ausentes viram None
+    if df_display.empty: return {}
+    df = df_display.reindex(columns=_KEYS + ['valor'])
+    grouped = df.groupby(_KEYS, dropna=False)['valor'].agg(['sum', 'count'])
+    return {
+        tuple(None if pd.isna(k) else k for k in key): [float(total), int(count)]
+        for key, total, count in zip(grouped.index, grouped['sum'], grouped['count'])
+    }
+
+
+class AggregateCube:
+    # Somas por ano, mês, tipo, categoria e subcategoria (com as recorrentes já
+    # expandidas). Cada ano é materializado na primeira consulta e, daí em diante,
+    # atualizado de forma incremental pelas notificações do store.
+
+    def __init__(self, store):
+        self._store = store
+        self._years = {}
+        self._queries = {}
+        store.subscribe(self._on_change)
+
+    def _year(self, year):
+        cells = self._years.get(year)
+        if cells is None:
+            cells = self._years[year] = _cells(expand_transactions_for_year(self._store.year_frame(year), year))
+        return cells
+
+    def _on_change(self, op, records):
+        self._queries.clear()
+        if op == "clear":
+            self._years.clear()
+            return
+        if not self._years or not records: return
+        sign = 1 if op == "add" else -1
+        df_changed = transactions_frame(records)
+        for year, cells in self._years.items():
+            for key, (total, count) in _cells(expand_transactions_for_year(df_changed, year)).items():
+                cell = cells.setdefault(key, [0.0, 0])
+                cell[0] += sign * total
+                cell[1] += sign * count
+                if cell[1] <= 0: del cells[key]
+
+    def _query(self, name, year, month, build):
+        # Sob a trava de leitura do store: as atualizações incrementais chegam
+        # com a trava de escrita, então nenhuma consulta vê um ano pela metade
+        key = (name, year, month)
+        with self._store.lock.read():
+            result = self._queries.get(key)
+            if result is None:
+                cells = self._year(year).items()
+                if month is not None:
+                    cells = [(k, v) for k, v in cells if k[0] == month]
+                result = self._queries[key] = build(cells)
+        return result
+
+    # --- Consultas usadas pelo dashboard ---
+    def totals(self, year, month=None):
+        def build(cells):
+            totals = {"Receita": 0.0, "Despesa": 0.0}
+            for (_, tipo, _, _), (total, _) in cells:
+                if tipo in totals: totals[tipo] += total
+            return totals
+        return self._query("totals", year, month, build)
+
+    def expenses_by_category(self, year, month=None):
+        def build(cells):
+            sums = {}
+            for (_, tipo, categoria, _), (total, _) in cells:
+                if tipo == "Despesa" and categoria is not None:
+                    sums[categoria] = sums.get(categoria, 0.0) + total
+            return pd.Series(sums, dtype=float, name='valor').rename_axis('categoria').sort_index()
+        return self._query("by_category", year, month, build)
+
+    def subcategory_totals(self, year, month=None, categoria=CARD_CATEGORY):
+        def build(cells):
+            sums = {}
+            for (_, _, cat, subcategoria), (total, _) in cells:
+                if cat == categoria and subcategoria is not None:
+                    sums[subcategoria] = sums.get(subcategoria, 0.0) + total
+            series = pd.Series(sums, dtype=float, name='valor').rename_axis('subcategoria')
+            return series.sort_values(ascending=False)
+        return self._query(f"by_subcategory:{categoria}", year, month, build)
+
+    def monthly_by_type(self, year):
+        def build(cells):
+            sums = {}
+            for (mes, tipo, _, _), (total, _) in cells:
+                if tipo is None: continue
+                sums[(mes, tipo)] = sums.get((mes, tipo), 0.0) + total
+            if not sums: return pd.DataFrame(columns=["Receita", "Despesa"], dtype=float)
+            summary = pd.Series(sums).rename_axis(['mes', 'tipo']).sort_index().unstack(fill_value=0)
+            summary.columns.name = 'tipo'
+            if 'Receita' not in summary: summary['Receita'] = 0
+            if 'Despesa' not in summary: summary['Despesa'] = 0
+            return summary
+        return self._query("monthly_by_type", year, None, build)
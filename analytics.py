@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from importers import CARD_CATEGORY
+from processing import recurring_mask
+
+_KEYS = ['tipo', 'categoria', 'subcategoria']
+
+
+def _month_number(value):
+    # Meses contados a partir do ano zero (ano * 12 + mês - 1), para aritmética em vetor
+    value = pd.Timestamp(value)
+    return value.year * 12 + value.month - 1
+
+def _month_starts(numbers):
+    numbers = np.asarray(numbers)
+    return pd.to_datetime(pd.DataFrame({'year': numbers // 12, 'month': numbers % 12 + 1, 'day': 1}))
+
+
+def monthly_cells(df_completo: pd.DataFrame, start, end) -> pd.DataFrame:
+    # Soma e quantidade por (mês, tipo, categoria, subcategoria) de start a end,
+    # meses inteiros. Cada recorrente vale em todos os meses a partir do seu
+    # início: em vez de repetir a transação mês a mês, o valor entra uma vez no
+    # primeiro mês e a soma acumulada ao longo dos meses o propaga.
+    columns = ['mes'] + _KEYS + ['valor', 'quantidade']
+    first, last = _month_number(start), _month_number(end)
+    if df_completo.empty or last < first: return pd.DataFrame(columns=columns)
+    df = df_completo.reindex(columns=_KEYS + ['valor'])
+    months = df_completo['data'].dt.year.to_numpy() * 12 + df_completo['data'].dt.month.to_numpy() - 1
+    recurring = recurring_mask(df_completo).to_numpy()
+
+    parts = []
+    single = ~recurring & (months >= first) & (months <= last)
+    if single.any():
+        parts.append(df[single].assign(mes=months[single], quantidade=1))
+
+    steps = recurring & (months <= last)
+    if steps.any():
+        df_steps = df[steps]
+        codes = df_steps.groupby(_KEYS, dropna=False, sort=False).ngroup().to_numpy()
+        keys = df_steps.drop_duplicates(_KEYS)[_KEYS].reset_index(drop=True)
+        rows = np.maximum(months[steps], first) - first
+        totals = np.zeros((last - first + 1, len(keys)))
+        counts = np.zeros((last - first + 1, len(keys)), dtype=np.int64)
+        np.add.at(totals, (rows, codes), df_steps['valor'].to_numpy(dtype=float))
+        np.add.at(counts, (rows, codes), 1)
+        totals, counts = totals.cumsum(axis=0), counts.cumsum(axis=0)
+        month_pos, key_pos = np.nonzero(counts)
+        expanded = keys.take(key_pos).reset_index(drop=True)
+        expanded['valor'] = totals[month_pos, key_pos]
+        expanded['mes'] = month_pos + first
+        expanded['quantidade'] = counts[month_pos, key_pos]
+        parts.append(expanded)
+
+    if not parts: return pd.DataFrame(columns=columns)
+    cells = pd.concat(parts, ignore_index=True).groupby(['mes'] + _KEYS, dropna=False, sort=True)
+    cells = cells[['valor', 'quantidade']].sum().reset_index()
+    cells['mes'] = _month_starts(cells['mes']).to_numpy()
+    return cells[columns]
+
+
+def opening_balance(df_completo: pd.DataFrame, start) -> float:
+    # Saldo de todos os meses anteriores a start: avulsas até o mês anterior e
+    # cada recorrente multiplicada pelos meses em que já estava ativa
+    if df_completo.empty: return 0.0
+    first = _month_number(start)
+    months = df_completo['data'].dt.year.to_numpy() * 12 + df_completo['data'].dt.month.to_numpy() - 1
+    recurring = recurring_mask(df_completo).to_numpy()
+    active = np.where(recurring, np.clip(first - months, 0, None), months < first)
+    tipo = df_completo['tipo'] if 'tipo' in df_completo else pd.Series(None, index=df_completo.index)
+    sign = np.select([tipo.eq("Receita").to_numpy(), tipo.eq("Despesa").to_numpy()], [1.0, -1.0], 0.0)
+    valores = pd.to_numeric(df_completo['valor'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return float((valores * sign * active).sum())
+
+
+class RangeAnalytics:
+    # Consultas sobre um intervalo de vários anos. As recorrentes são
+    # materializadas uma única vez para o intervalo inteiro (monthly_cells) e
+    # cada consulta é um pivô ou soma acumulada vetorizada sobre essa tabela.
+
+    def __init__(self, df_completo, start, end):
+        first, last = _month_number(start), _month_number(end)
+        self.months = pd.DatetimeIndex(_month_starts(np.arange(first, last + 1)), name='mes')
+        self.cells = monthly_cells(df_completo, start, end)
+        self.opening_balance = opening_balance(df_completo, start)
+
+    def _pivot(self, cells, index, columns):
+        if cells.empty: return pd.DataFrame(index=pd.Index([], name=index), dtype=float)
+        table = cells.pivot_table(index=index, columns=columns, values='valor', aggfunc='sum', fill_value=0.0)
+        table.columns.name = columns
+        return table
+
+    def monthly_balance(self):
+        # Receita, Despesa e Saldo de cada mês do intervalo (meses vazios com zero)
+        table = self._pivot(self.cells, 'mes', 'tipo').reindex(self.months, fill_value=0.0)
+        balance = pd.DataFrame({tipo: table[tipo] if tipo in table else 0.0 for tipo in ("Receita", "Despesa")},
+                               index=self.months)
+        balance['Saldo'] = balance['Receita'] - balance['Despesa']
+        return balance
+
+    def rolling_balance(self, window=12):
+        # Saldo acumulado dos últimos "window" meses, mês a mês
+        balance = self.monthly_balance()
+        return balance.rolling(window, min_periods=1).sum().rename(columns=lambda c: f"{c} ({window} meses)")
+
+    def net_worth(self, initial=None):
+        # Patrimônio acumulado: saldo anterior ao intervalo (tudo o que veio antes,
+        # salvo outro valor informado) mais a soma dos saldos mensais
+        initial = self.opening_balance if initial is None else initial
+        return (initial + self.monthly_balance()['Saldo'].cumsum()).rename('Patrimônio')
+
+    def year_over_year(self, tipo="Despesa", by='categoria'):
+        # Totais por ano (colunas) e por categoria/subcategoria (linhas), com a
+        # variação percentual do último ano em relação ao anterior
+        cells = self.cells[self.cells['tipo'] == tipo].dropna(subset=[by])
+        table = self._pivot(cells.assign(ano=cells['mes'].dt.year), by, 'ano')
+        if len(table.columns) >= 2:
+            previous, current = table.iloc[:, -2], table.iloc[:, -1]
+            table['Variação (%)'] = ((current - previous) / previous.where(previous != 0) * 100).round(1)
+        return table
+
+    def subcategory_trends(self, categoria=CARD_CATEGORY, freq='MS'):
+        # Evolução de cada subcategoria (ex.: do cartão) por mês ou por ano ('YS')
+        cells = self.cells[self.cells['categoria'] == categoria].dropna(subset=['subcategoria'])
+        periods = self.months if freq == 'MS' else self.months.to_series().resample(freq).first().index
+        if cells.empty: return pd.DataFrame(index=periods, dtype=float)
+        table = self._pivot(cells, 'mes', 'subcategoria')
+        if freq != 'MS': table = table.resample(freq).sum()
+        return table.reindex(periods, fill_value=0.0)
@@ -1,147 +1,113 @@
 import streamlit as st
 import pandas as pd
-from datetime import date, datetime
+from datetime import date
 import calendar
-import json
-import os
 import uuid
-import re
-from dateutil.relativedelta import relativedelta
+from functools import partial
+from classifier import load_classifier
+from storage import JsonDocument, open_store
+from processing import expand_transactions_for_year
+from aggregates import AggregateCube
+from analytics import RangeAnalytics
+from exporters import EXPORT_FORMATS, available_formats, export_file
+from profiling import RerunProfiler, profiling_enabled_by_default
+from importers import EXTRATO_REQUIRED_COLS, FATURA_REQUIRED_COLS, read_statement_columns, parse_extrato, parse_fatura, stream_import
 
 # --- Nomes dos arquivos de dados ---
 DATA_FILE = "finance_data.json"
 CATEGORIES_FILE = "finance_categories.json"
 SUBCATEGORIES_FILE = "subcategories.json" # <-- ARQUIVO EXTERNO DE REGRAS
-
-# --- FUNÇÕES: Lógica de Subcategoria ---
-def clean_merchant_name(name: str) -> str:
-    if not isinstance(name, str): return ''
-    name = name.upper()
-    name = re.sub(r'^[A-Z]{2,4}\*([A-Z0-9]+\*)?', '', name)
-    name = re.sub(r'[^A-Z0-9\s]', '', name)
-    return name.strip()
-
-def get_subcategory(merchant_name: str, rules: dict) -> str:
-    if not rules: return 'Diversos'
-    cleaned_name = clean_merchant_name(merchant_name)
-    sorted_keywords = sorted(rules.keys(), key=len, reverse=True)
-    
-    for keyword in sorted_keywords:
-        if keyword in cleaned_name:
-            return rules[keyword]
-            
-    return 'Diversos'
+PAGE_SIZE = 50 # Linhas por página nas tabelas de lançamentos
+YEAR_CACHE_ENTRIES = 8 # Anos processados mantidos em cache (versões antigas saem primeiro)
+RANGE_CACHE_ENTRIES = 4 # Intervalos de análise mantidos em cache
+NEAR_DUPLICATE_LABEL = "Ignorar quase-duplicados (mesma data e valor, descrição parecida)"
 
 # --- Configurações da Página ---
 st.set_page_config(page_title="Controle Financeiro Avançado", layout="wide")
 
-# --- Funções de Persistência de Dados (Salvar/Carregar) ---
-def save_data(filepath, data):
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+# --- Instrumentação opcional (tempos por etapa desta execução) ---
+if "session_id" not in st.session_state: st.session_state.session_id = uuid.uuid4().hex[:8]
+profiler = RerunProfiler(enabled=st.session_state.get("debug_profiling", profiling_enabled_by_default()),
+                         session=st.session_state.session_id)
 
-def load_data(filepath):
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {} if "subcategories" in filepath else []
-    return {} if "subcategories" in filepath else []
-
-# --- Lógica para gerar parcelas ---
-def generate_installments(original_transaction):
-    installments = []
-    if isinstance(original_transaction.get('data'), (datetime, date)):
-        original_transaction['data'] = original_transaction['data'].strftime('%Y-%m-%d')
-
-    parcela_str = str(original_transaction.get('parcela', '')).strip()
-    total_installments = 1
-    if '/' in parcela_str:
-        try: total_installments = int(parcela_str.split('/')[1])
-        except (ValueError, IndexError): total_installments = 1
-    elif parcela_str.isdigit() and int(parcela_str) > 1:
-        total_installments = int(parcela_str)
-
-    if total_installments <= 1:
-        original_transaction.pop('parcela', None)
-        original_transaction['id'] = str(uuid.uuid4())
-        return [original_transaction]
-    try:
-        purchase_date = pd.to_datetime(original_transaction['data'])
-    except Exception:
-        st.error(f"Formato de data inválido para a transação: {original_transaction['descricao']}")
-        return []
-    base_description = re.sub(r'\s*\d+/\d+\s*$', '', original_transaction['descricao']).strip()
-    for i in range(total_installments):
-        payment_date = purchase_date + pd.DateOffset(months=i)
-        installment_number = i + 1
-        new_transaction = original_transaction.copy()
-        new_transaction['data'] = payment_date.strftime('%Y-%m-%d')
-        new_transaction['descricao'] = f"{base_description} ({installment_number}/{total_installments})"
-        new_transaction['parcela'] = f"{installment_number}/{total_installments}"
-        new_transaction['id'] = str(uuid.uuid4())
-        installments.append(new_transaction)
-    return installments
-
-# --- Inicialização do Estado da Sessão ---
-if "transactions" not in st.session_state:
-    st.session_state.transactions = load_data(DATA_FILE)
-    for t in st.session_state.transactions:
-        if 'id' not in t: t['id'] = str(uuid.uuid4())
-
-if "categories" not in st.session_state:
-    default_categories = ["Cartão de Crédito", "Moradia", "Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Outros"]
-    st.session_state.categories = load_data(CATEGORIES_FILE)
-    if not st.session_state.categories: st.session_state.categories = default_categories
-
-if "subcat_rules" not in st.session_state:
-    st.session_state.subcat_rules = load_data(SUBCATEGORIES_FILE)
-    if not st.session_state.subcat_rules:
-        st.session_state.subcat_rules = {"AMAZON": "Varejo Online"}
-        save_data(SUBCATEGORIES_FILE, st.session_state.subcat_rules)
+# --- Dados compartilhados entre sessões ---
+@st.cache_resource
+def shared_resources():
+    # Um único store (com cubo, categorias e regras) por processo: todas as abas
+    # leem os mesmos objetos e as gravações são serializadas pelas travas
+    store = open_store(DATA_FILE)
+    categories = JsonDocument(CATEGORIES_FILE, ["Cartão de Crédito", "Moradia", "Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Outros"])
+    subcat_rules = JsonDocument(SUBCATEGORIES_FILE, {"AMAZON": "Varejo Online"}, save_default=True)
+    return store, AggregateCube(store), categories, subcat_rules
+
+with profiler.stage("inicializacao"):
+    store, cube, categories, subcat_rules = shared_resources()
+    store.refresh()  # incorpora o que outro processo (ex.: a CLI) gravou
 
 # --- Funções de Formatação e Utilitários ---
 def format_currency(value):
     if pd.isna(value): return ""
     return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def display_transactions(df_trans, type_name):
+def display_transactions(df_trans, type_name, key):
+    # Tabela paginada: filtro, ordenação e fatiamento são feitos aqui no servidor
+    # e só a página visível é enviada ao navegador
     st.subheader(type_name)
-    df_sorted = df_trans.sort_values(by="data")
-    if df_sorted.empty:
+    if df_trans.empty:
         st.info(f"Nenhuma transação do tipo '{type_name}' neste mês.")
         return
 
     # --- MODIFICADO: Coluna Subcategoria removida da exibição ---
+    columns = {"data": "Data", "descricao": "Descrição", "valor": "Valor"}
     if type_name == "Despesas":
-        cols = st.columns([0.15, 0.5, 0.2, 0.15])
-        cols[0].markdown("**Data**")
-        cols[1].markdown("**Descrição**")
-        cols[2].markdown("**Categoria**")
-        cols[3].markdown("**Valor**")
-    else:
-        cols = st.columns([0.2, 0.6, 0.2])
-        cols[0].markdown("**Data**")
-        cols[1].markdown("**Descrição**")
-        cols[2].markdown("**Valor**")
-
-    for _, row in df_sorted.iterrows():
-        data_formatada = row['data'].strftime('%d/%m/%Y')
-        if type_name == "Despesas":
-            cols = st.columns([0.15, 0.5, 0.2, 0.15])
-            cols[0].write(data_formatada)
-            cols[1].write(row['descricao'])
-            cols[2].write(row['categoria'])
-            cols[3].write(format_currency(row['valor']))
-        else:
-            cols = st.columns([0.2, 0.6, 0.2])
-            cols[0].write(data_formatada)
-            cols[1].write(row['descricao'])
-            cols[2].write(format_currency(row['valor']))
+        columns = {"data": "Data", "descricao": "Descrição", "categoria": "Categoria", "valor": "Valor"}
+
+    f_col, s_col, o_col = st.columns([0.5, 0.3, 0.2])
+    search = f_col.text_input("Filtrar por descrição", key=f"{key}_filtro")
+    sort_label = s_col.selectbox("Ordenar por", list(columns.values()), key=f"{key}_ordem")
+    descending = o_col.checkbox("Decrescente", key=f"{key}_desc")
+
+    df_view = df_trans
+    if search:
+        df_view = df_view[df_view['descricao'].str.contains(search, case=False, regex=False, na=False)]
+    if df_view.empty:
+        st.info("Nenhum lançamento corresponde ao filtro.")
+        return
+    sort_col = next(col for col, label in columns.items() if label == sort_label)
+    df_view = df_view.sort_values(by=sort_col, ascending=not descending, kind="stable")
+
+    total_pages = -(-len(df_view) // PAGE_SIZE)
+    page_key = f"{key}_pagina"
+    if st.session_state.get(page_key, 1) > total_pages: st.session_state[page_key] = total_pages
+    page = 1
+    if total_pages > 1:
+        page = st.number_input("Página", min_value=1, max_value=total_pages, step=1, key=page_key)
+    df_page = df_view.iloc[(page - 1) * PAGE_SIZE: page * PAGE_SIZE]
+
+    table = pd.DataFrame({label: df_page[col] for col, label in columns.items()})
+    table["Data"] = df_page['data'].dt.strftime('%d/%m/%Y')
+    table["Valor"] = df_page['valor'].map(format_currency)
+    st.dataframe(table, hide_index=True, use_container_width=True)
+    st.caption(f"{len(df_view)} lançamento(s) — página {page} de {total_pages}")
+
+def show_rejected_rows(state_key):
+    # Relatório das linhas recusadas na última importação
+    rejected = st.session_state.get(state_key)
+    if rejected is None or rejected.empty: return
+    st.warning(f"{len(rejected)} linha(s) não foram importadas.")
+    st.dataframe(rejected, hide_index=True, use_container_width=True)
+
+def run_streaming_import(uploaded_file, parse, near=False):
+    # Importa o CSV em blocos, gravando cada bloco no store e mostrando o progresso
+    index = store.dedup_index(near=near)
+    progress_bar = st.progress(0.0, text="Importando...")
+    result = stream_import(uploaded_file, lambda chunk, index: parse(chunk, index, near), index, store.add, lock=store.exclusive,
+                           progress=lambda fraction: progress_bar.progress(fraction, text="Importando..."))
+    progress_bar.empty()
+    return result
 
 # --- Barra Lateral (Sidebar) ---
-with st.sidebar:
+with st.sidebar, profiler.stage("barra_lateral"):
     st.title("💰 Controle Financeiro")
     
     st.header("Adicionar Lançamento Manual", divider='rainbow')
@@ -158,8 +124,7 @@ with st.sidebar:
                         "id": str(uuid.uuid4()), "data": str(revenue_date), "descricao": revenue_description.strip(),
                         "valor": float(revenue_value), "tipo": "Receita", "categoria": "N/A"
                     }
-                    st.session_state.transactions.append(new_transaction)
-                    save_data(DATA_FILE, st.session_state.transactions)
+                    store.add([new_transaction])
                     st.success("Receita adicionada!")
                     # --- MODIFICADO: st.rerun() removido para corrigir o bug ---
 
@@ -168,7 +133,7 @@ with st.sidebar:
             expense_description = st.text_input("Descrição")
             expense_value = st.number_input("Valor (R$)", min_value=0.01, format="%.2f")
             expense_date = st.date_input("Data", date.today())
-            expense_category = st.selectbox("Categoria", st.session_state.categories)
+            expense_category = st.selectbox("Categoria", categories.value)
             is_recurring = st.checkbox("É uma despesa recorrente/fixa?")
             if st.form_submit_button("Adicionar Despesa", use_container_width=True):
                 if expense_description and expense_value:
@@ -177,8 +142,7 @@ with st.sidebar:
                         "valor": float(expense_value), "tipo": "Despesa", "categoria": expense_category,
                         "recorrente": is_recurring
                     }
-                    st.session_state.transactions.append(new_transaction)
-                    save_data(DATA_FILE, st.session_state.transactions)
+                    store.add([new_transaction])
                     st.success("Despesa adicionada!")
                     # --- MODIFICADO: st.rerun() removido para corrigir o bug ---
     
@@ -188,36 +152,20 @@ with st.sidebar:
         uploaded_extrato_file = st.file_uploader("Selecione o arquivo CSV do extrato", type=["csv"], key="extrato_uploader")
         if uploaded_extrato_file is not None:
             try:
-                df_extrato = pd.read_csv(uploaded_extrato_file, sep=';', dtype=str, encoding='utf-8-sig').fillna('')
-                df_extrato.columns = df_extrato.columns.str.strip()
-                required_cols = {'data', 'lançamento', 'categoria', 'valor', 'recorrente'}
-                if not required_cols.issubset(df_extrato.columns):
+                required_cols = EXTRATO_REQUIRED_COLS
+                if not required_cols.issubset(read_statement_columns(uploaded_extrato_file)):
                     st.error(f"Arquivo inválido! Colunas necessárias: {', '.join(required_cols)}")
                 else:
+                    near_extrato = st.checkbox(NEAR_DUPLICATE_LABEL, key="near_extrato")
                     if st.button("Importar Novos Lançamentos", use_container_width=True, key="confirm_extrato"):
-                        existing_transactions = {(t['data'], t['descricao'].strip()) for t in st.session_state.transactions}
-                        new_transactions_to_add = []
-                        for _, row in df_extrato.iterrows():
-                            try:
-                                data = pd.to_datetime(row['data'], dayfirst=True).strftime('%Y-%m-%d')
-                                descricao = row['lançamento'].strip()
-                                if not descricao: continue
-                                if (data, descricao) in existing_transactions: continue
-                                valor = float(str(row['valor']).replace('.', '').replace(',', '.'))
-                                if valor >= 0:
-                                    new_transaction = {"id": str(uuid.uuid4()), "data": data, "descricao": descricao, "valor": valor, "tipo": "Receita", "categoria": "N/A", "recorrente": False}
-                                else:
-                                    new_transaction = {"id": str(uuid.uuid4()), "data": data, "descricao": descricao, "valor": abs(valor), "tipo": "Despesa", "categoria": row['categoria'].strip(), "recorrente": str(row['recorrente']).strip().lower() == 'true'}
-                                new_transactions_to_add.append(new_transaction)
-                                existing_transactions.add((data, descricao))
-                            except (ValueError, TypeError): continue
-                        if new_transactions_to_add:
-                            st.session_state.transactions.extend(new_transactions_to_add)
-                            save_data(DATA_FILE, st.session_state.transactions)
-                            st.success(f"{len(new_transactions_to_add)} novos lançamentos foram adicionados.")
+                        result = run_streaming_import(uploaded_extrato_file, parse_extrato, near_extrato)
+                        st.session_state.extrato_rejected = result.rejected
+                        if result.added:
+                            st.success(f"{result.added} novos lançamentos foram adicionados.")
                             st.rerun()
                         else:
                             st.info("Nenhum lançamento novo para importar.")
+                    show_rejected_rows("extrato_rejected")
             except Exception as e:
                 st.error(f"Ocorreu um erro ao processar o arquivo de extrato: {e}")
 
@@ -225,189 +173,208 @@ with st.sidebar:
         uploaded_file = st.file_uploader("Selecione o arquivo CSV da fatura", type=["csv"], key="fatura_uploader")
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file, sep=';', dtype=str, encoding='utf-8-sig').fillna('')
-                df.columns = df.columns.str.strip()
-                required_cols = {'data', 'lançamento', 'parcela', 'valor'}
-                if not required_cols.issubset(df.columns):
+                required_cols = FATURA_REQUIRED_COLS
+                if not required_cols.issubset(read_statement_columns(uploaded_file)):
                     st.error(f"Arquivo inválido! Colunas necessárias: {', '.join(required_cols)}")
                 else:
+                    near_fatura = st.checkbox(NEAR_DUPLICATE_LABEL, key="near_fatura")
                     if st.button("Importar Novas Despesas da Fatura", use_container_width=True):
-                        classification_rules = st.session_state.subcat_rules
-                        existing_transactions = {(t['data'], t['descricao'].strip()) for t in st.session_state.transactions}
-                        new_transactions_to_add = []
-                        df.rename(columns={'lançamento': 'descricao'}, inplace=True)
-                        
-                        for _, row in df.iterrows():
-                            try:
-                                # --- INÍCIO DA LÓGICA DE AJUSTE DE DATA ---
-                                
-                                # 1. Converte a data da compra para um objeto datetime
-                                purchase_date = pd.to_datetime(row['data'], dayfirst=True)
-
-                                # 2. Descobre qual é o último dia do mês da compra
-                                _, last_day_of_month = calendar.monthrange(purchase_date.year, purchase_date.month)
-
-                                # 3. Se a compra foi no último dia do mês...
-                                if purchase_date.day == last_day_of_month:
-                                    # ...ajusta a data para o primeiro dia do mês seguinte
-                                    purchase_date = (purchase_date + relativedelta(months=1)).replace(day=1)
-
-                                # --- FIM DA LÓGICA DE AJUSTE DE DATA ---
-                                subcategory = get_subcategory(row['descricao'], classification_rules)
-                                base_transaction = {
-                                    "tipo": "Despesa", "categoria": "Cartão de Crédito",
-                                    "subcategoria": subcategory, "recorrente": False, "data": purchase_date,
-                                    "descricao": row['descricao'].strip(),
-                                    "valor": float(str(row['valor']).replace('.', '').replace(',', '.')),
-                                    "parcela": row['parcela'].strip()
-                                }
-                                if not base_transaction["descricao"]: continue
-                                potential_installments = generate_installments(base_transaction.copy())
-                                for trans in potential_installments:
-                                    key = (trans['data'], trans['descricao'].strip())
-                                    if key not in existing_transactions:
-                                        new_transactions_to_add.append(trans)
-                                        existing_transactions.add(key)
-                            except (ValueError, TypeError): continue
-                        
-                        if new_transactions_to_add:
-                            st.session_state.transactions.extend(new_transactions_to_add)
-                            save_data(DATA_FILE, st.session_state.transactions)
-                            st.success(f"{len(new_transactions_to_add)} novas despesas foram adicionadas.")
+                        classifier = load_classifier(SUBCATEGORIES_FILE, fallback_rules=subcat_rules.value)
+                        result = run_streaming_import(uploaded_file, lambda chunk, index, near: parse_fatura(chunk, index, classifier, near), near_fatura)
+                        st.session_state.fatura_rejected = result.rejected
+                        if result.added:
+                            st.success(f"{result.added} novas despesas foram adicionadas.")
                             st.rerun()
                         else:
                             st.info("Nenhuma despesa nova para importar.")
+                    show_rejected_rows("fatura_rejected")
             except Exception as e:
                 st.error(f"Ocorreu um erro ao processar o arquivo da fatura: {e}")
     
     st.header("Gerenciamento", divider='rainbow')
     with st.expander("⚙️ Gerenciar Categorias"):
-        for category in st.session_state.categories:
+        for category in categories.value:
             col1, col2 = st.columns([0.8, 0.2])
             col1.write(category)
             if col2.button("🗑️", key=f"del_cat_{category}", use_container_width=True):
-                st.session_state.categories.remove(category)
-                save_data(CATEGORIES_FILE, st.session_state.categories)
+                categories.update(lambda current: [c for c in current if c != category])
                 st.rerun()
         with st.form("new_category_form", clear_on_submit=True):
             new_category = st.text_input("Nova Categoria")
             if st.form_submit_button("Adicionar", use_container_width=True):
-                if new_category and new_category not in st.session_state.categories:
-                    st.session_state.categories.append(new_category)
-                    save_data(CATEGORIES_FILE, st.session_state.categories)
+                if new_category and new_category not in categories.value:
+                    categories.update(lambda current: current if new_category in current else current + [new_category])
                     st.rerun()
-    if st.session_state.transactions:
-        df_export = pd.DataFrame(st.session_state.transactions)
-        csv = df_export.to_csv(index=False, sep=';', encoding='utf-8-sig').encode('utf-8')
-        st.download_button(label="📥 Exportar Dados para CSV", data=csv, file_name='dados_financeiros.csv', mime='text/csv', use_container_width=True)
+    with profiler.stage("exportacao"):
+        if not store.is_empty():
+            with st.expander("📥 Exportar Dados"):
+                # Só os filtros são montados aqui; o arquivo é gerado ao clicar no botão
+                export_format = st.radio("Formato", available_formats(), horizontal=True, key="export_format")
+                export_years = st.multiselect("Anos (vazio = todos)", store.available_years(), key="export_years")
+                export_types = st.multiselect("Tipos", ["Receita", "Despesa"], default=["Receita", "Despesa"], key="export_types")
+                export_period = st.date_input("Período (opcional)", value=(), format="DD/MM/YYYY", key="export_period")
+                start, end = (tuple(export_period) + (None, None))[:2]
+                file_name, mime = EXPORT_FORMATS[export_format]
+                st.download_button(label=f"📥 Exportar Dados para {export_format}", file_name=file_name, mime=mime, use_container_width=True,
+                                   data=partial(export_file, store, export_format, years=export_years,
+                                                start=start, end=end or start, tipos=export_types))
     if st.button("🗑️ Limpar Todos os Dados", type="primary", use_container_width=True):
-        st.session_state.transactions = []
-        save_data(DATA_FILE, st.session_state.transactions)
+        store.clear()
         st.success("Todos os dados foram apagados.")
         st.rerun()
+    st.checkbox("🛠️ Modo de depuração (tempos por etapa)", value=profiling_enabled_by_default(), key="debug_profiling")
 
 # --- Lógica de Processamento Anual (Cache) ---
-@st.cache_data
-def process_transactions_for_year(transactions_list, selected_year):
-    df_completo = pd.DataFrame(transactions_list)
-    if df_completo.empty: return pd.DataFrame()
-    df_completo['data'] = pd.to_datetime(df_completo['data'])
-    expanded_transactions = []
-    for _, t in df_completo.iterrows():
-        if t.get('recorrente'):
-            start_date = t['data']
-            if start_date.year <= selected_year:
-                for month in range(1, 13):
-                    if (start_date.year < selected_year) or (start_date.year == selected_year and start_date.month <= month):
-                        new_t = t.to_dict(); valid_day = min(start_date.day, calendar.monthrange(selected_year, month)[1])
-                        new_t['data'] = datetime(selected_year, month, valid_day); new_t['original_id'] = new_t['id']
-                        expanded_transactions.append(new_t)
-        elif t['data'].year == selected_year:
-            expanded_transactions.append(t.to_dict())
-    if not expanded_transactions: return pd.DataFrame()
-    df_display = pd.DataFrame(expanded_transactions); df_display["mes"] = df_display["data"].dt.month
-    return df_display
+@st.cache_data(max_entries=YEAR_CACHE_ENTRIES)
+def process_transactions_for_year(_store, data_version, selected_year, _profiler=None):
+    # A chave do cache é só (versão, ano): o store (prefixo "_") não é hasheado.
+    # O corpo só executa quando o cache falha. Cada gravação (de qualquer sessão)
+    # muda a versão; o limite de entradas descarta os anos de versões antigas.
+    if _profiler is None: return expand_transactions_for_year(_store.year_frame(selected_year), selected_year)
+    _profiler.record("cache_processamento_anual", "miss")
+    with _profiler.stage("calculo_anual"):
+        return expand_transactions_for_year(_store.year_frame(selected_year), selected_year)
+
+@st.cache_data(max_entries=RANGE_CACHE_ENTRIES)
+def range_analytics(_store, data_version, start_year, end_year):
+    # Recorrentes materializadas uma vez para todo o intervalo, por versão dos
+    # dados; como em process_transactions_for_year, versões antigas são descartadas
+    return RangeAnalytics(_store.frame(), date(start_year, 1, 1), date(end_year, 12, 31))
 
 # --- Página Principal ---
 st.title("Dashboard Financeiro")
-if not st.session_state.transactions:
+if store.is_empty():
     st.info("Nenhuma transação registrada. Adicione uma receita ou despesa na barra lateral para começar.")
 else:
-    df_completo_base = pd.DataFrame(st.session_state.transactions)
-    df_completo_base['data'] = pd.to_datetime(df_completo_base['data'])
-    available_years = sorted(list(set(df_completo_base['data'].dt.year)), reverse=True)
+    with profiler.stage("anos_disponiveis"):
+        available_years = store.available_years()
     if not available_years: available_years.append(date.today().year)
     selected_year = st.selectbox("Selecione o Ano para visualizar:", available_years)
     
-    df_display = process_transactions_for_year(tuple(st.session_state.transactions), selected_year)
+    data_version = store.version
+    # O tempo próprio desta etapa é o do st.cache_data (hash dos argumentos, busca
+    # e cópia do resultado); o cálculo, quando o cache falha, é a etapa interna
+    with profiler.stage("cache_processamento_anual"):
+        profiler.record("cache_processamento_anual", "hit")
+        df_display = process_transactions_for_year(store, data_version, selected_year, _profiler=profiler)
+    profiler.record("linhas_ano", len(df_display))
 
     if df_display.empty:
         st.warning(f"Nenhuma transação encontrada para o ano de {selected_year}.")
     else:
         meses_nomes = [calendar.month_name[i] for i in range(1, 13)]
         tab_list = ["Resumo Anual"] + meses_nomes
-        tabs = st.tabs(tab_list)
+        # Só a visão selecionada é calculada e desenhada (st.tabs renderiza todas as abas)
+        selected_view = st.radio("Visualização", tab_list, horizontal=True, key="selected_view", label_visibility="collapsed")
 
-        with tabs[0]: # Resumo Anual
-            st.header(f"Resumo de {selected_year}")
-            df_year = df_display
+        with profiler.stage(f"render:{selected_view}"):
+            if selected_view == "Resumo Anual":
+                st.header(f"Resumo de {selected_year}")
+                totals_year = cube.totals(selected_year)
+                total_revenue_year = totals_year["Receita"]
+                total_expenses_year = totals_year["Despesa"]
+                balance_year = total_revenue_year - total_expenses_year
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Saldo Final", format_currency(balance_year))
+                col2.metric("Total de Receitas", format_currency(total_revenue_year))
+                col3.metric("Total de Despesas", format_currency(total_expenses_year))
+
+                st.markdown("---")
+                st.subheader("Despesas por Categoria no Ano")
+                expenses_by_cat_year = cube.expenses_by_category(selected_year)
+                if not expenses_by_cat_year.empty: st.bar_chart(expenses_by_cat_year)
             
-            total_revenue_year = df_year[df_year["tipo"] == "Receita"]["valor"].sum()
-            total_expenses_year = df_year[df_year["tipo"] == "Despesa"]["valor"].sum()
-            balance_year = total_revenue_year - total_expenses_year
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Saldo Final", format_currency(balance_year))
-            col2.metric("Total de Receitas", format_currency(total_revenue_year))
-            col3.metric("Total de Despesas", format_currency(total_expenses_year))
-
-            st.markdown("---")
-            st.subheader("Despesas por Categoria no Ano")
-            expenses_by_cat_year = df_year[df_year['tipo'] == 'Despesa'].groupby('categoria')['valor'].sum()
-            if not expenses_by_cat_year.empty: st.bar_chart(expenses_by_cat_year)
+                st.subheader("Análise Anual do Cartão de Crédito")
+                expenses_by_subcat_year = cube.subcategory_totals(selected_year)
+                if not expenses_by_subcat_year.empty:
+                    st.bar_chart(expenses_by_subcat_year)
+                else:
+                    st.info("Nenhuma despesa de Cartão de Crédito registrada neste ano.")
             
-            st.subheader("Análise Anual do Cartão de Crédito")
-            df_card_year = df_year[df_year['categoria'] == 'Cartão de Crédito']
-            if not df_card_year.empty:
-                expenses_by_subcat_year = df_card_year.groupby('subcategoria')['valor'].sum().sort_values(ascending=False)
-                st.bar_chart(expenses_by_subcat_year)
+                st.subheader("Evolução Mensal (Receitas vs. Despesas)")
+                st.bar_chart(cube.monthly_by_type(selected_year))
+
             else:
-                st.info("Nenhuma despesa de Cartão de Crédito registrada neste ano.")
-            
-            st.subheader("Evolução Mensal (Receitas vs. Despesas)")
-            monthly_summary = df_year.groupby(['mes', 'tipo'])['valor'].sum().unstack(fill_value=0)
-            if 'Receita' not in monthly_summary: monthly_summary['Receita'] = 0
-            if 'Despesa' not in monthly_summary: monthly_summary['Despesa'] = 0
-            st.bar_chart(monthly_summary)
-
-        for i, mes_nome in enumerate(meses_nomes):
-            with tabs[i+1]:
-                mes_num = i + 1
+                mes_nome = selected_view
+                mes_num = meses_nomes.index(mes_nome) + 1
                 df_month = df_display[df_display["mes"] == mes_num]
+                profiler.record("linhas_mes", len(df_month))
                 if df_month.empty:
                     st.info(f"Nenhuma transação registrada para {mes_nome} de {selected_year}.")
-                    continue
-                
-                st.subheader(f"Resumo de {mes_nome}")
-                total_revenue = df_month[df_month["tipo"] == "Receita"]["valor"].sum()
-                total_expenses = df_month[df_month["tipo"] == "Despesa"]["valor"].sum()
-                current_balance = total_revenue - total_expenses
-                m_col1, m_col2, m_col3 = st.columns(3)
-                m_col1.metric("Saldo do Mês", format_currency(current_balance))
-                m_col2.metric("Total de Receitas", format_currency(total_revenue))
-                m_col3.metric("Total de Despesas", format_currency(total_expenses))
+                else:
+                    st.subheader(f"Resumo de {mes_nome}")
+                    totals_month = cube.totals(selected_year, mes_num)
+                    total_revenue = totals_month["Receita"]
+                    total_expenses = totals_month["Despesa"]
+                    current_balance = total_revenue - total_expenses
+                    m_col1, m_col2, m_col3 = st.columns(3)
+                    m_col1.metric("Saldo do Mês", format_currency(current_balance))
+                    m_col2.metric("Total de Receitas", format_currency(total_revenue))
+                    m_col3.metric("Total de Despesas", format_currency(total_expenses))
                 
-                expenses_by_cat_month = df_month[df_month['tipo'] == 'Despesa'].groupby('categoria')['valor'].sum()
-                if not expenses_by_cat_month.empty: st.bar_chart(expenses_by_cat_month)
+                    expenses_by_cat_month = cube.expenses_by_category(selected_year, mes_num)
+                    if not expenses_by_cat_month.empty: st.bar_chart(expenses_by_cat_month)
                 
-                st.subheader("Análise do Cartão de Crédito no Mês")
-                df_card_month = df_month[df_month['categoria'] == 'Cartão de Crédito']
-                if not df_card_month.empty:
-                    expenses_by_subcat_month = df_card_month.groupby('subcategoria')['valor'].sum().sort_values(ascending=False)
-                    st.bar_chart(expenses_by_subcat_month)
-                else:
-                    st.info("Nenhuma despesa de Cartão de Crédito registrada neste mês.")
+                    st.subheader("Análise do Cartão de Crédito no Mês")
+                    expenses_by_subcat_month = cube.subcategory_totals(selected_year, mes_num)
+                    if not expenses_by_subcat_month.empty:
+                        st.bar_chart(expenses_by_subcat_month)
+                    else:
+                        st.info("Nenhuma despesa de Cartão de Crédito registrada neste mês.")
 
-                st.markdown("---")
-                display_transactions(df_month[df_month["tipo"] == "Receita"], "Receitas")
-                st.markdown("---")
-                display_transactions(df_month[df_month["tipo"] == "Despesa"], "Despesas")
\ No newline at end of file
+                    st.markdown("---")
+                    grid_key = f"grid_{selected_year}_{mes_num}"
+                    display_transactions(df_month[df_month["tipo"] == "Receita"], "Receitas", f"{grid_key}_receitas")
+                    st.markdown("---")
+                    display_transactions(df_month[df_month["tipo"] == "Despesa"], "Despesas", f"{grid_key}_despesas")
+
+    # --- Análise de vários anos (só calculada quando aberta) ---
+    st.markdown("---")
+    if st.toggle("📈 Análise de vários anos", key="range_view"):
+        with profiler.stage("render:varios_anos"):
+            years = sorted(available_years)
+            start_year, end_year = years[0], years[-1]
+            if len(years) > 1:
+                start_year, end_year = st.select_slider("Período", options=years, value=(start_year, end_year), key="range_years")
+            analytics = range_analytics(store, data_version, start_year, end_year)
+            profiler.record("celulas_intervalo", len(analytics.cells))
+            balance = analytics.monthly_balance()
+            net_worth = analytics.net_worth()
+
+            r_col1, r_col2, r_col3 = st.columns(3)
+            r_col1.metric("Patrimônio Acumulado", format_currency(net_worth.iloc[-1]))
+            r_col2.metric("Total de Receitas", format_currency(balance["Receita"].sum()))
+            r_col3.metric("Total de Despesas", format_currency(balance["Despesa"].sum()))
+
+            st.subheader("Saldo Móvel de 12 Meses")
+            st.line_chart(analytics.rolling_balance(12))
+            st.subheader("Patrimônio Acumulado")
+            st.area_chart(net_worth)
+
+            st.subheader("Despesas por Categoria, Ano a Ano")
+            yoy = analytics.year_over_year("Despesa", by="categoria").rename(columns=str)
+            if yoy.empty:
+                st.info("Nenhuma despesa registrada no período.")
+            else:
+                currency_columns = {c: st.column_config.NumberColumn(format="R$ %.2f") for c in yoy.columns if c != "Variação (%)"}
+                st.dataframe(yoy, use_container_width=True, column_config=currency_columns)
+
+            st.subheader("Tendência das Subcategorias do Cartão de Crédito")
+            trend_freq = st.radio("Agrupar por", ["Mês", "Ano"], horizontal=True, key="range_trend_freq")
+            trends = analytics.subcategory_trends(freq="MS" if trend_freq == "Mês" else "YS")
+            if trends.empty or trends.columns.empty:
+                st.info("Nenhuma despesa de Cartão de Crédito registrada no período.")
+            else:
+                st.line_chart(trends)
+
+# --- Painel de depuração ---
+profile_summary = profiler.finish()
+if profile_summary:
+    with st.expander("🛠️ Depuração: tempos desta execução"):
+        st.write(f"Tempo total: {profile_summary['total_s'] * 1000:.1f} ms")
+        df_stages = pd.DataFrame(profile_summary["etapas"])
+        df_stages["ms"] = (df_stages.pop("segundos") * 1000).round(2)
+        df_stages["próprio (ms)"] = (df_stages.pop("proprio_s") * 1000).round(2)
+        st.dataframe(df_stages, hide_index=True, use_container_width=True)
+        st.json(profile_summary["contadores"])
+        st.caption(f"Registrado em {profiler.log_path}")
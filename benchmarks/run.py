@@ -0,0 +1,183 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from aggregates import AggregateCube
+from analytics import RangeAnalytics
+from benchmarks.synthetic import (generate_extrato_csv, generate_fatura_csv, generate_rules,
+                                  generate_transactions)
+from classifier import SubcategoryClassifier
+from dedup import DedupIndex
+from importers import parse_extrato, parse_fatura, read_statement_csv, stream_import
+from processing import expand_transactions_for_year, transactions_frame
+from storage import open_store, save_data
+
+# Suíte de benchmarks do pipeline financeiro:
+#   python -m benchmarks.run --tamanhos 10000 100000 --saida bench.json
+#   python -m benchmarks.run --tamanhos 10000 --comparar bench.json
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def measure(func, repeats):
+    # Melhor tempo entre as repetições e pico de memória (tracemalloc) da primeira
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), peak
+
+
+def _without_ids(records):
+    for t in records: t.pop('id', None)
+    return records
+
+
+# --- Casos ---
+@case("armazenamento")
+def bench_storage(size, workdir):
+    transactions = generate_transactions(size)
+    path = os.path.join(workdir, "store.json")
+    save_data(path, transactions)
+    batch = _without_ids(generate_transactions(100, seed=1))
+    results = {}
+    results["carregar"] = (lambda: open_store(path), size)
+    store = open_store(path)
+    def add_batch():
+        store.add([dict(t) for t in batch])
+    results["incluir_100"] = (add_batch, len(batch))
+    results["compactar"] = (store.compact, size)
+    return results
+
+@case("processamento_anual")
+def bench_year(size, workdir):
+    df = transactions_frame(generate_transactions(size))
+    return {"expandir_ano": (lambda: expand_transactions_for_year(df, 2024), size)}
+
+@case("classificacao")
+def bench_classification(size, workdir):
+    rules = generate_rules(5000)
+    names = read_statement_csv(generate_fatura_csv(os.path.join(workdir, "cls.csv"), size))['lançamento']
+    return {
+        "compilar_regras": (lambda: SubcategoryClassifier(rules), len(rules)),
+        "classificar_lote": (lambda: SubcategoryClassifier(rules).classify_series(names), size),
+    }
+
+@case("importacao")
+def bench_import(size, workdir):
+    classifier = SubcategoryClassifier(generate_rules(1000))
+    fatura_path = generate_fatura_csv(os.path.join(workdir, "fatura.csv"), size)
+    extrato_path = generate_extrato_csv(os.path.join(workdir, "extrato.csv"), size)
+    fatura, extrato = read_statement_csv(fatura_path), read_statement_csv(extrato_path)
+    index = DedupIndex.from_records(generate_transactions(size, seed=2))
+
+    def streamed():
+        store = open_store(os.path.join(workdir, f"stream_{time.perf_counter_ns()}.json"))
+        with open(fatura_path, "rb") as f:
+            stream_import(f, lambda chunk, idx: parse_fatura(chunk, idx, classifier), store.dedup_index(), store.add)
+    return {
+        "extrato": (lambda: parse_extrato(extrato, index), size),
+        "fatura": (lambda: parse_fatura(fatura, index, classifier), size),
+        "fatura_em_lotes": (streamed, size),
+    }
+
+@case("agregacao")
+def bench_aggregation(size, workdir):
+    path = os.path.join(workdir, "cube.json")
+    save_data(path, generate_transactions(size))
+    store = open_store(path)
+    batch = _without_ids(generate_transactions(100, seed=3))
+
+    def materialize():
+        cube = AggregateCube(store)
+        cube.totals(2024)
+        store.unsubscribe(cube._on_change)
+    cube = AggregateCube(store)
+    cube.totals(2024)
+    def incremental():
+        store.add([dict(t) for t in batch])
+        cube.totals(2024)
+    return {"materializar_ano": (materialize, size), "incremental_100": (incremental, len(batch))}
+
+@case("analise_intervalo")
+def bench_range(size, workdir):
+    df = transactions_frame(generate_transactions(size))
+    start, end = df['data'].min(), df['data'].max()
+    analytics = RangeAnalytics(df, start, end)
+    def queries():
+        analytics.rolling_balance()
+        analytics.net_worth()
+        analytics.year_over_year()
+        analytics.subcategory_trends()
+    return {"materializar_intervalo": (lambda: RangeAnalytics(df, start, end), size), "consultas": (queries, size)}
+
+
+# --- Execução ---
+def run(sizes, cases, repeats):
+    results = []
+    for size in sizes:
+        for name in cases:
+            with tempfile.TemporaryDirectory() as workdir:
+                for step, (func, rows) in CASES[name](size, workdir).items():
+                    seconds, peak = measure(func, repeats)
+                    results.append({
+                        "caso": name, "etapa": step, "tamanho": size, "segundos": seconds,
+                        "linhas_por_segundo": rows / seconds if seconds else None,
+                        "pico_memoria_mb": peak / 2 ** 20,
+                    })
+                    print(f"{name:20} {step:18} {size:>9}  {seconds:9.4f}s  "
+                          f"{results[-1]['linhas_por_segundo'] or 0:>14,.0f} linhas/s  {results[-1]['pico_memoria_mb']:8.1f} MB")
+    return results
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["caso"], r["etapa"], r["tamanho"]): r for r in json.load(f)["resultados"]}
+    print(f"\nComparação com {baseline_path} (razão > 1 = mais lento agora):")
+    for r in results:
+        old = baseline.get((r["caso"], r["etapa"], r["tamanho"]))
+        if old is None: continue
+        print(f"{r['caso']:20} {r['etapa']:18} {r['tamanho']:>9}  tempo x{r['segundos'] / old['segundos']:6.2f}  "
+              f"memória x{r['pico_memoria_mb'] / max(old['pico_memoria_mb'], 1e-9):6.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de controle financeiro.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000],
+                        help="quantidade de linhas geradas por caso (ex.: 10000 100000 1000000)")
+    parser.add_argument("--casos", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--comparar", help="compara com um JSON gravado por uma execução anterior")
+    args = parser.parse_args(argv)
+
+    results = run(args.tamanhos, args.casos, args.repeticoes)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"data": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "resultados": results}, f, ensure_ascii=False, indent=4)
+    if args.comparar:
+        compare(results, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
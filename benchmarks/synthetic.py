@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Gerador de dados sintéticos para os benchmarks (tamanhos de 10 mil a 1 milhão de linhas)
+MERCHANTS = ["AMAZON", "UBER", "IFOOD", "NETFLIX", "SPOTIFY", "MERCADO LIVRE", "POSTO SHELL",
+             "DROGASIL", "CARREFOUR", "PADARIA", "RESTAURANTE", "FARMACIA", "LIVRARIA", "CINEMA"]
+CATEGORIES = ["Moradia", "Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Outros"]
+
+
+def _dates(rng, n, start_year, end_year):
+    start = np.datetime64(f"{start_year}-01-01")
+    days = (np.datetime64(f"{end_year + 1}-01-01") - start).astype(int)
+    return pd.Series(start + rng.integers(0, days, n)).dt.strftime('%Y-%m-%d')
+
+def _merchant_names(rng, n, unique_merchants):
+    base = np.array(MERCHANTS)[rng.integers(0, len(MERCHANTS), n)]
+    suffix = rng.integers(0, unique_merchants, n).astype(str)
+    return pd.Series(base) + " " + pd.Series(suffix)
+
+
+def generate_transactions(n, start_year=2015, end_year=2025, recurring_ratio=0.01, card_ratio=0.5, seed=0):
+    # Lista de transações no mesmo formato gravado pelo app
+    rng = np.random.default_rng(seed)
+    tipo = np.where(rng.random(n) < 0.2, "Receita", "Despesa")
+    card = (tipo == "Despesa") & (rng.random(n) < card_ratio)
+    categoria = np.where(tipo == "Receita", "N/A",
+                         np.where(card, "Cartão de Crédito", np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)]))
+    df = pd.DataFrame({
+        "id": [f"syn-{seed}-{i}" for i in range(n)],
+        "data": _dates(rng, n, start_year, end_year),
+        "descricao": _merchant_names(rng, n, 5000),
+        "valor": np.round(rng.gamma(2.0, 80.0, n), 2),
+        "tipo": tipo,
+        "categoria": categoria,
+        "recorrente": (tipo == "Despesa") & ~card & (rng.random(n) < recurring_ratio),
+    })
+    records = df.to_dict('records')
+    subcategorias = np.array(["Varejo Online", "Transporte", "Alimentação", "Assinaturas"])
+    for t, subcategoria, is_card in zip(records, subcategorias[rng.integers(0, 4, n)], card):
+        if is_card: t["subcategoria"] = subcategoria
+    return records
+
+def generate_rules(n_keywords, seed=0):
+    # Regras de subcategoria: palavras-chave de tamanhos variados
+    rng = np.random.default_rng(seed)
+    rules = {m: f"Sub {i % 20}" for i, m in enumerate(MERCHANTS)}
+    while len(rules) < n_keywords:
+        merchant = MERCHANTS[rng.integers(0, len(MERCHANTS))]
+        rules[f"{merchant} {rng.integers(0, 10 * n_keywords)}"] = f"Sub {len(rules) % 20}"
+    return rules
+
+def _to_br_amount(values):
+    return pd.Series(values).map(lambda v: f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+
+def generate_fatura_csv(path, n, installment_ratio=0.2, start_year=2023, end_year=2024, seed=0):
+    rng = np.random.default_rng(seed)
+    totals = rng.integers(2, 13, n)
+    current = np.minimum(rng.integers(1, 13, n), totals)
+    parcela = np.where(rng.random(n) < installment_ratio,
+                       pd.Series(current).astype(str) + "/" + pd.Series(totals).astype(str), "")
+    dates = pd.to_datetime(_dates(rng, n, start_year, end_year)).dt.strftime('%d/%m/%Y')
+    pd.DataFrame({
+        "data": dates, "lançamento": "PG *" + _merchant_names(rng, n, 2000),
+        "parcela": parcela, "valor": _to_br_amount(np.round(rng.gamma(2.0, 60.0, n), 2)),
+    }).to_csv(path, sep=';', index=False)
+    return path
+
+def generate_extrato_csv(path, n, start_year=2020, end_year=2024, seed=0):
+    rng = np.random.default_rng(seed)
+    valor = np.round(rng.gamma(2.0, 150.0, n), 2) * np.where(rng.random(n) < 0.3, 1, -1)
+    dates = pd.to_datetime(_dates(rng, n, start_year, end_year)).dt.strftime('%d/%m/%Y')
+    pd.DataFrame({
+        "data": dates, "lançamento": "PIX " + _merchant_names(rng, n, 2000),
+        "categoria": np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)],
+        "valor": _to_br_amount(valor), "recorrente": np.where(rng.random(n) < 0.02, "True", "False"),
+    }).to_csv(path, sep=';', index=False)
+    return path
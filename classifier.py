@@ -0,0 +1,125 @@
+import json
+import os
+import re
+from collections import deque
+
+import pandas as pd
+
+DEFAULT_SUBCATEGORY = 'Diversos'
+
+# --- Expressões pré-compiladas (antes eram recompiladas a cada linha) ---
+_PREFIX_RE = re.compile(r'^[A-Z]{2,4}\*([A-Z0-9]+\*)?')
+_NON_ALNUM_RE = re.compile(r'[^A-Z0-9\s]')
+
+
+def clean_merchant_name(name: str) -> str:
+    if not isinstance(name, str): return ''
+    name = name.upper()
+    name = _PREFIX_RE.sub('', name)
+    name = _NON_ALNUM_RE.sub('', name)
+    return name.strip()
+
+
+class SubcategoryClassifier:
+    # Autômato Aho-Corasick construído uma única vez a partir das regras.
+    # Mantém a semântica original: vence a palavra-chave mais longa contida no
+    # nome; em caso de empate de tamanho, vence a que aparece primeiro no arquivo.
+
+    def __init__(self, rules: dict, default: str = DEFAULT_SUBCATEGORY):
+        self.rules = dict(rules or {})
+        self.default = default
+        # Mesma ordem de prioridade do sort estável usado antes
+        self._keywords = sorted(self.rules.keys(), key=len, reverse=True)
+        self._empty_rank = None
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+        self._build()
+
+    def _build(self):
+        goto, best = self._goto, self._best
+        for rank, keyword in enumerate(self._keywords):
+            if keyword == '':
+                # "" está contido em qualquer texto: vira o fallback de menor prioridade
+                self._empty_rank = rank
+                continue
+            state = 0
+            for char in keyword:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({}); self._fail.append(0); best.append(None)
+                state = nxt
+            if best[state] is None or rank < best[state]:
+                best[state] = rank
+
+        # Links de falha em BFS; cada estado herda a melhor saída do seu sufixo
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and char not in goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = goto[f].get(char, 0)
+                inherited = best[self._fail[nxt]]
+                if inherited is not None and (best[nxt] is None or inherited < best[nxt]):
+                    best[nxt] = inherited
+
+    def _match_rank(self, cleaned_name: str):
+        goto, fail, best = self._goto, self._fail, self._best
+        state, found = 0, None
+        for char in cleaned_name:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            rank = best[state]
+            if rank is not None and (found is None or rank < found):
+                found = rank
+                if found == 0: break
+        if found is None:
+            found = self._empty_rank
+        return found
+
+    def classify(self, merchant_name) -> str:
+        if not self.rules: return self.default
+        rank = self._match_rank(clean_merchant_name(merchant_name))
+        return self.default if rank is None else self.rules[self._keywords[rank]]
+
+    def classify_series(self, names: pd.Series) -> pd.Series:
+        # Classifica cada nome distinto uma única vez (faturas repetem muito os estabelecimentos)
+        if names.empty:
+            return pd.Series([], index=names.index, dtype=object)
+        uniques = pd.unique(names)
+        mapping = {name: self.classify(name) for name in uniques}
+        return names.map(mapping)
+
+
+# --- Cache do classificador compilado ---
+_file_cache = {}
+
+
+def load_classifier(filepath: str, fallback_rules: dict = None) -> SubcategoryClassifier:
+    # Recompila apenas quando o arquivo de regras muda (mtime/tamanho)
+    try:
+        stat = os.stat(filepath)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    cached = _file_cache.get(filepath)
+    if cached is not None and signature is not None and cached[0] == signature:
+        return cached[1]
+    rules = {}
+    if signature is not None:
+        with open(filepath, "r", encoding="utf-8") as f:
+            try: rules = json.load(f)
+            except json.JSONDecodeError: rules = {}
+    if not rules and fallback_rules:
+        rules = fallback_rules
+    classifier = SubcategoryClassifier(rules)
+    if signature is not None:
+        _file_cache[filepath] = (signature, classifier)
+    return classifier
+
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from classifier import load_classifier
+from dedup import DedupIndex
+from importers import (EXTRATO_REQUIRED_COLS, FATURA_REQUIRED_COLS, detect_statement_kind,
+                       merge_import_results, parse_extrato, parse_fatura, read_statement_csv)
+from storage import open_store
+
+# Importação em lote sem interface: python cli.py extratos/*.csv faturas/*.csv
+DATA_FILE = "finance_data.json"
+SUBCATEGORIES_FILE = "subcategories.json"
+
+
+def parse_file(path, kind, rules_path):
+    # Executado nos processos filhos: lê e converte um arquivo inteiro,
+    # deduplicando só dentro dele (o cruzamento com o histórico é feito no final)
+    df = read_statement_csv(path)
+    kind = detect_statement_kind(df.columns) if kind == "auto" else kind
+    required = {"extrato": EXTRATO_REQUIRED_COLS, "fatura": FATURA_REQUIRED_COLS}.get(kind)
+    if required is None or not required.issubset(df.columns):
+        raise ValueError("colunas necessárias ausentes ou tipo de arquivo desconhecido")
+    if kind == "extrato":
+        return kind, parse_extrato(df, DedupIndex())
+    return kind, parse_fatura(df, DedupIndex(), load_classifier(rules_path))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Importa extratos e faturas (CSV) em lote, sem a interface do Streamlit.")
+    parser.add_argument("arquivos", nargs="+", help="arquivos CSV a importar")
+    parser.add_argument("--tipo", choices=["auto", "extrato", "fatura"], default="auto",
+                        help="formato dos arquivos (padrão: detectado pelo cabeçalho)")
+    parser.add_argument("--dados", default=DATA_FILE, help=f"arquivo de transações (padrão: {DATA_FILE})")
+    parser.add_argument("--regras", default=SUBCATEGORIES_FILE, help=f"regras de subcategoria (padrão: {SUBCATEGORIES_FILE})")
+    parser.add_argument("--backend", choices=["json", "parquet"], default=None,
+                        help="backend de armazenamento (padrão: variável FINANCE_STORAGE ou json)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(), help="número de processos paralelos")
+    parser.add_argument("--quase-duplicados", action="store_true",
+                        help="ignora lançamentos com mesma data e valor e descrição parecida")
+    parser.add_argument("--rejeitados", help="grava as linhas recusadas neste CSV")
+    parser.add_argument("--simular", action="store_true", help="mostra o resultado sem gravar nada")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results, rejected, failed = [], [], 0
+    with ProcessPoolExecutor(max_workers=max(1, args.processos)) as pool:
+        futures = [pool.submit(parse_file, path, args.tipo, args.regras) for path in args.arquivos]
+        for path, future in zip(args.arquivos, futures):
+            try:
+                kind, result = future.result()
+            except Exception as e:
+                print(f"{path}: erro ao processar o arquivo: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            print(f"{path} ({kind}): {len(result.records)} lançamento(s), "
+                  f"{result.duplicates} repetido(s) no arquivo, {len(result.rejected)} linha(s) recusada(s)")
+            results.append(result)
+            if not result.rejected.empty:
+                rejected.append(result.rejected.assign(arquivo=path))
+
+    # Na simulação o store é aberto só para leitura: nem o índice de
+    # deduplicação é salvo
+    store = open_store(args.dados, args.backend, read_only=args.simular)
+    total = sum(len(result.records) for result in results)
+    # Trava do arquivo durante a deduplicação e a gravação: um app aberto (ou
+    # outra execução) não grava no meio, e o app relê o que for gravado aqui
+    with store.exclusive():
+        new_records = merge_import_results(results, store.dedup_index(near=args.quase_duplicados), args.quase_duplicados)
+        if not args.simular:
+            # Um único commit deduplicado para todos os arquivos
+            store.add(new_records)
+    if args.simular:
+        print(f"{len(new_records)} novo(s) lançamento(s) seriam adicionados ({total - len(new_records)} já existentes).")
+    else:
+        print(f"{len(new_records)} novo(s) lançamento(s) adicionados ({total - len(new_records)} já existentes).")
+
+    if args.rejeitados and rejected:
+        pd.concat(rejected, ignore_index=True).to_csv(args.rejeitados, index=False, sep=';')
+        print(f"Linhas recusadas gravadas em {args.rejeitados}.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import uuid
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+NEAR_DUPLICATE_RATIO = 0.85
+# Muda sempre que o cálculo da chave muda: índices salvos em outro formato são descartados
+KEY_FORMAT = 2
+_WHITESPACE = '[\\s\u00a0]+'
+# Delta do índice salvo: cabeçalho com a geração do snapshot + (chave, +1/-1) por alteração
+DELTA_SUFFIX = ".delta"
+_DELTA_DTYPE = np.dtype([('key', '<u8'), ('sign', 'i1')])
+_GENERATION_BYTES = 16
+
+
+def normalize_description(descricao) -> str:
+    return ' '.join(str(descricao).split()).upper()
+
+def _cents(valor):
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if valor != valor else int(round(valor * 100))
+
+def dedup_keys(datas, descricoes, valores) -> np.ndarray:
+    # Chaves de 64 bits calculadas em coluna inteira: data (AAAA-MM-DD) +
+    # descrição normalizada + valor em centavos
+    datas = pd.Series(datas).reset_index(drop=True).astype(str).str.slice(0, 10)
+    descricoes = (pd.Series(descricoes).reset_index(drop=True).astype(str)
+                  .str.replace(_WHITESPACE, ' ', regex=True).str.strip().str.upper())
+    valores = pd.to_numeric(pd.Series(valores).reset_index(drop=True), errors='coerce').to_numpy(dtype=float)
+    cents = np.round(np.where(np.isfinite(valores), valores, 0) * 100).astype(np.int64)
+    frame = pd.DataFrame({'data': datas, 'descricao': descricoes, 'centavos': cents})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+def dedup_key(data, descricao, valor) -> int:
+    return int(dedup_keys([data], [descricao], [valor])[0])
+
+def record_keys(records) -> np.ndarray:
+    return dedup_keys([t.get('data') for t in records], [t.get('descricao', '') for t in records],
+                      [t.get('valor') for t in records])
+
+
+class DedupIndex:
+    # Índice de deduplicação das importações. Guarda só as chaves de 64 bits
+    # (com contagem, pois lançamentos manuais podem se repetir) e é mantido pelo
+    # store a cada inclusão/exclusão. O índice de quase-duplicados (mesma data e
+    # valor, descrição parecida) é opcional e montado na primeira vez que é usado.
+
+    def __init__(self, counts=None):
+        self._counts = counts or {}
+        self._near = None
+
+    @classmethod
+    def from_records(cls, records):
+        index = cls()
+        index.add(records)
+        return index
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def contains(self, keys) -> np.ndarray:
+        # Pertinência de um vetor de chaves; custo proporcional ao vetor, não ao índice
+        counts = self._counts
+        return np.fromiter((key in counts for key in keys.tolist()), dtype=bool, count=len(keys))
+
+    # --- Manutenção ---
+    def add(self, records):
+        counts = self._counts
+        for key in record_keys(records).tolist():
+            counts[key] = counts.get(key, 0) + 1
+        if self._near is not None:
+            for t in records:
+                bucket = self._near.setdefault((str(t.get('data'))[:10], _cents(t.get('valor'))), [])
+                bucket.append(normalize_description(t.get('descricao', '')))
+
+    def remove(self, records):
+        counts = self._counts
+        for key in record_keys(records).tolist():
+            if counts.get(key, 0) > 1: counts[key] -= 1
+            else: counts.pop(key, None)
+        if self._near is not None:
+            for t in records:
+                bucket = self._near.get((str(t.get('data'))[:10], _cents(t.get('valor'))), [])
+                description = normalize_description(t.get('descricao', ''))
+                if description in bucket: bucket.remove(description)
+
+    def clear(self):
+        self._counts.clear()
+        self._near = None
+
+    def on_change(self, op, records):
+        # Assinante das notificações do store
+        if op == "add": self.add(records)
+        elif op == "delete": self.remove(records)
+        elif op == "clear": self.clear()
+
+    # --- Quase-duplicados ---
+    def enable_near(self, records):
+        if self._near is not None: return
+        self._near = {}
+        for t in records:
+            bucket = self._near.setdefault((str(t.get('data'))[:10], _cents(t.get('valor'))), [])
+            bucket.append(normalize_description(t.get('descricao', '')))
+
+    def has_near(self, data, descricao, valor, ratio=NEAR_DUPLICATE_RATIO):
+        if self._near is None: return False
+        candidates = self._near.get((str(data)[:10], _cents(valor)))
+        if not candidates: return False
+        description = normalize_description(descricao)
+        return any(SequenceMatcher(None, description, other).ratio() >= ratio for other in candidates)
+
+    # --- Persistência ---
+    # O snapshot (.npz) é regravado só de vez em quando (compactação, delta
+    # grande); cada alteração do store apenas anexa suas chaves ao delta.
+    def save(self, filepath, signature):
+        # Grava as chaves num .npz com a assinatura dos dados e uma geração nova,
+        # e recomeça o delta com essa geração
+        keys = np.fromiter(self._counts.keys(), dtype=np.uint64, count=len(self._counts))
+        counts = np.fromiter(self._counts.values(), dtype=np.uint32, count=len(self._counts))
+        generation = uuid.uuid4().hex[:_GENERATION_BYTES]
+        _atomic_write(filepath, ".npz", lambda f: np.savez(
+            f, keys=keys, counts=counts, signature=np.array(json.dumps(signature)),
+            key_format=np.array(KEY_FORMAT), generation=np.array(generation)))
+        _atomic_write(filepath + DELTA_SUFFIX, DELTA_SUFFIX, lambda f: f.write(generation.encode('ascii')))
+
+    @staticmethod
+    def append_delta(filepath, added=(), removed=()):
+        # Sem snapshot não há o que manter: a próxima carga reconstrói o índice
+        path = filepath + DELTA_SUFFIX
+        if not os.path.exists(path): return
+        entries = np.empty(len(added) + len(removed), dtype=_DELTA_DTYPE)
+        entries['key'] = np.concatenate([np.asarray(added, dtype=np.uint64), np.asarray(removed, dtype=np.uint64)])
+        entries['sign'][:len(added)] = 1
+        entries['sign'][len(added):] = -1
+        with open(path, "ab") as f:
+            f.write(entries.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def delta_entries(filepath):
+        path = filepath + DELTA_SUFFIX
+        if not os.path.exists(path): return 0
+        return max(os.path.getsize(path) - _GENERATION_BYTES, 0) // _DELTA_DTYPE.itemsize
+
+    @classmethod
+    def load(cls, filepath, signature, total=None):
+        # Snapshot + delta. Devolve None se algo não corresponder aos dados atuais:
+        # formato da chave, assinatura, geração do delta ou total de lançamentos.
+        if not os.path.exists(filepath) or not os.path.exists(filepath + DELTA_SUFFIX): return None
+        try:
+            with np.load(filepath) as saved:
+                if 'key_format' not in saved or int(saved['key_format']) != KEY_FORMAT:
+                    return None
+                if json.loads(str(saved['signature'])) != json.loads(json.dumps(signature)):
+                    return None
+                generation = str(saved['generation'])
+                counts = dict(zip(saved['keys'].tolist(), saved['counts'].tolist()))
+            with open(filepath + DELTA_SUFFIX, "rb") as f:
+                if f.read(_GENERATION_BYTES).decode('ascii') != generation:
+                    return None
+                data = f.read()
+        except (OSError, ValueError, KeyError, UnicodeDecodeError):
+            return None
+        # Um registro cortado por uma queda no fim do delta é ignorado (e pego pelo total)
+        entries = np.frombuffer(data[:len(data) - len(data) % _DELTA_DTYPE.itemsize], dtype=_DELTA_DTYPE)
+        for key, sign in zip(entries['key'].tolist(), entries['sign'].tolist()):
+            count = counts.get(key, 0) + sign
+            if count > 0: counts[key] = count
+            else: counts.pop(key, None)
+        if total is not None and sum(counts.values()) != total:
+            return None
+        return cls(counts)
+
+
+def _atomic_write(filepath, suffix, write):
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
@@ -0,0 +1,78 @@
+import io
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # exportação em Parquet é opcional
+    pa = pq = None
+
+EXPORT_CHUNK_ROWS = 50_000
+EXPORT_FORMATS = {
+    "CSV": ("dados_financeiros.csv", "text/csv"),
+    "Parquet": ("dados_financeiros.parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    return [name for name in EXPORT_FORMATS if name != "Parquet" or pq is not None]
+
+
+# --- Seleção dos lançamentos ---
+def export_frame(store, years=None, start=None, end=None, tipos=None) -> pd.DataFrame:
+    # Lançamentos gravados (sem expandir as recorrentes) que passam nos filtros.
+    # Com filtro de ano, só as partições desses anos são lidas (backend Parquet).
+    if store.is_empty(): return pd.DataFrame()
+    if years:
+        frames = []
+        for year in sorted(set(years)):
+            df = store.year_frame(year)
+            if not df.empty: frames.append(df[df['data'].dt.year == year])
+        if not frames: return pd.DataFrame()
+        df = pd.concat(frames) if len(frames) > 1 else frames[0]
+    else:
+        df = store.frame()
+    if df.empty: return df
+    mask = pd.Series(True, index=df.index)
+    if start is not None: mask &= df['data'] >= pd.Timestamp(start)
+    if end is not None: mask &= df['data'] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    if tipos: mask &= df['tipo'].isin(tipos)
+    return df[mask]
+
+def iter_export_chunks(df: pd.DataFrame, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Blocos com a data de volta ao formato gravado (AAAA-MM-DD)
+    for begin in range(0, len(df), chunk_rows):
+        chunk = df.iloc[begin:begin + chunk_rows]
+        yield chunk.assign(data=chunk['data'].dt.strftime('%Y-%m-%d'))
+
+
+# --- Gravação em blocos ---
+def write_csv(df: pd.DataFrame, out, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Mesmo layout de sempre: separador ";" e cabeçalho na primeira linha
+    if df.empty:
+        out.write(df.to_csv(index=False, sep=';').encode('utf-8'))
+        return
+    for i, chunk in enumerate(iter_export_chunks(df, chunk_rows)):
+        out.write(chunk.to_csv(index=False, header=(i == 0), sep=';').encode('utf-8'))
+
+def write_parquet(df: pd.DataFrame, out, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Um row group por bloco; o esquema é inferido uma vez sobre todas as linhas
+    if pq is None:
+        raise ImportError("A exportação em Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+    schema = pa.Schema.from_pandas(df.drop(columns='data', errors='ignore'), preserve_index=False)
+    if 'data' in df:
+        schema = schema.insert(df.columns.get_loc('data'), pa.field('data', pa.string()))
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in iter_export_chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def export_file(store, fmt="CSV", chunk_rows=EXPORT_CHUNK_ROWS, **filters):
+    # Gera o arquivo sob demanda, bloco a bloco, e o devolve como BytesIO no
+    # início (um dos tipos aceitos pelo download_button com geração adiada)
+    df = export_frame(store, **filters)
+    out = io.BytesIO()
+    if fmt == "Parquet": write_parquet(df, out, chunk_rows)
+    else: write_csv(df, out, chunk_rows)
+    out.seek(0)
+    return out
@@ -0,0 +1,281 @@
+import re
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from dedup import dedup_keys
+
+EXTRATO_REQUIRED_COLS = {'data', 'lançamento', 'categoria', 'valor', 'recorrente'}
+FATURA_REQUIRED_COLS = {'data', 'lançamento', 'parcela', 'valor'}
+CARD_CATEGORY = "Cartão de Crédito"
+_INSTALLMENT_SUFFIX = r'\s*\d+/\d+\s*$'
+
+
+IMPORT_CHUNK_ROWS = 20_000
+MAX_REJECTED_ROWS = 1_000
+
+
+@dataclass
+class ImportResult:
+    records: list = field(default_factory=list)
+    rejected: pd.DataFrame = field(default_factory=pd.DataFrame)
+    duplicates: int = 0
+    added: int = 0
+
+
+# --- Leitura e conversões em coluna inteira ---
+def read_statement_csv(file, **kwargs):
+    df = pd.read_csv(file, sep=';', dtype=str, encoding='utf-8-sig', **kwargs).fillna('')
+    df.columns = df.columns.str.strip()
+    return df
+
+def read_statement_columns(file):
+    # Lê só o cabeçalho e volta o arquivo para o início
+    columns = set(read_statement_csv(file, nrows=0).columns)
+    file.seek(0)
+    return columns
+
+def iter_statement_chunks(file, chunksize=IMPORT_CHUNK_ROWS):
+    with pd.read_csv(file, sep=';', dtype=str, encoding='utf-8-sig', chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk = chunk.fillna('')
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+def parse_br_dates(values: pd.Series) -> pd.Series:
+    # Caminho rápido para dd/mm/aaaa; o que sobrar é analisado elemento a elemento
+    parsed = pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')
+    retry = parsed.isna() & values.str.strip().ne('')
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], dayfirst=True, format='mixed', errors='coerce')
+    return parsed
+
+def parse_br_amounts(values: pd.Series) -> pd.Series:
+    # "1.234,56" -> 1234.56; valores inválidos viram NaN
+    cleaned = values.str.strip().str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+def _rejected_rows(df: pd.DataFrame, reasons: pd.Series) -> pd.DataFrame:
+    rejected = df.loc[reasons.notna()].copy()
+    rejected.insert(0, 'motivo', reasons.dropna())
+    # Linha no arquivo CSV (a linha 1 é o cabeçalho)
+    rejected.insert(0, 'linha', rejected.index + 2)
+    return rejected.reset_index(drop=True)
+
+def _new_ids(n):
+    return [str(uuid.uuid4()) for _ in range(n)]
+
+def _drop_known_keys(datas: pd.Series, descricoes: pd.Series, valores: pd.Series, index, near=False):
+    # Mantém só a primeira ocorrência de cada (data, descrição, valor) ainda não
+    # registrada no índice; o custo é proporcional ao arquivo novo, não ao histórico
+    keys = dedup_keys(datas, descricoes, valores)
+    keep = ~(index.contains(keys) | pd.Series(keys).duplicated().to_numpy())
+    if near and keep.any():
+        # Quase-duplicados (descrição parecida) só para as linhas ainda mantidas
+        candidates = np.flatnonzero(keep)
+        datas, descricoes, valores = list(datas), list(descricoes), list(valores)
+        for i in candidates.tolist():
+            if index.has_near(datas[i], descricoes[i], valores[i]): keep[i] = False
+    return keep
+
+
+# --- Extrato da conta corrente ---
+def parse_extrato(df: pd.DataFrame, index, near=False) -> ImportResult:
+    if df.empty:
+        return ImportResult()
+    datas = parse_br_dates(df['data'])
+    descricoes = df['lançamento'].str.strip()
+    valores = parse_br_amounts(df['valor'])
+
+    reasons = pd.Series(None, index=df.index, dtype=object)
+    reasons[valores.isna()] = 'valor inválido'
+    reasons[descricoes.eq('')] = 'descrição vazia'
+    reasons[datas.isna()] = 'data inválida'
+
+    ok = reasons.isna()
+    datas_str = datas[ok].dt.strftime('%Y-%m-%d')
+    keep = _drop_known_keys(datas_str, descricoes[ok], valores[ok].abs(), index, near)
+    rows = df.loc[ok][keep]
+    result = ImportResult(rejected=_rejected_rows(df, reasons), duplicates=int((~keep).sum()))
+    if rows.empty:
+        return result
+
+    valor = valores[rows.index]
+    is_receita = valor >= 0
+    new = pd.DataFrame({
+        "id": _new_ids(len(rows)),
+        "data": datas_str[rows.index],
+        "descricao": descricoes[rows.index],
+        "valor": valor.abs(),
+        "tipo": np.where(is_receita, "Receita", "Despesa"),
+        "categoria": rows['categoria'].str.strip().where(~is_receita, "N/A"),
+        "recorrente": rows['recorrente'].str.strip().str.lower().eq('true') & ~is_receita,
+    }, index=rows.index)
+    result.records = new.to_dict('records')
+    return result
+
+
+# --- Lógica para gerar parcelas ---
+def generate_installments(original_transaction):
+    # Versão linha a linha; parse_fatura expande a fatura inteira com o mesmo resultado
+    installments = []
+    if isinstance(original_transaction.get('data'), (datetime, date)):
+        original_transaction['data'] = original_transaction['data'].strftime('%Y-%m-%d')
+
+    parcela_str = str(original_transaction.get('parcela', '')).strip()
+    total_installments = 1
+    if '/' in parcela_str:
+        try: total_installments = int(parcela_str.split('/')[1])
+        except (ValueError, IndexError): total_installments = 1
+    elif parcela_str.isdigit() and int(parcela_str) > 1:
+        total_installments = int(parcela_str)
+
+    if total_installments <= 1:
+        original_transaction.pop('parcela', None)
+        original_transaction['id'] = str(uuid.uuid4())
+        return [original_transaction]
+    try:
+        purchase_date = pd.to_datetime(original_transaction['data'])
+    except Exception:
+        raise ValueError(f"Formato de data inválido para a transação: {original_transaction['descricao']}")
+    base_description = re.sub(_INSTALLMENT_SUFFIX, '', original_transaction['descricao']).strip()
+    for i in range(total_installments):
+        payment_date = purchase_date + pd.DateOffset(months=i)
+        installment_number = i + 1
+        new_transaction = original_transaction.copy()
+        new_transaction['data'] = payment_date.strftime('%Y-%m-%d')
+        new_transaction['descricao'] = f"{base_description} ({installment_number}/{total_installments})"
+        new_transaction['parcela'] = f"{installment_number}/{total_installments}"
+        new_transaction['id'] = str(uuid.uuid4())
+        installments.append(new_transaction)
+    return installments
+
+def parse_installment_totals(parcela: pd.Series) -> np.ndarray:
+    # Mesmas regras de generate_installments: "3/12" -> 12, "5" -> 5, resto -> 1
+    parcela = parcela.str.strip()
+    after_slash = parcela.str.split('/', n=2).str[1].fillna('')
+    slash_total = pd.to_numeric(after_slash.str.extract(r'^\s*([+-]?\d+)\s*$')[0], errors='coerce')
+    digit_total = pd.to_numeric(parcela.where(parcela.str.fullmatch(r'\d+', na=False)), errors='coerce')
+    totals = np.where(parcela.str.contains('/', regex=False), slash_total.fillna(1), digit_total.fillna(1))
+    return np.maximum(totals, 1).astype(np.int64)
+
+def add_months(dates: pd.Series, offsets: np.ndarray) -> pd.Series:
+    # Equivalente vetorizado de date + pd.DateOffset(months=n): o dia é limitado ao fim do mês
+    months = dates.dt.year.to_numpy() * 12 + dates.dt.month.to_numpy() - 1 + offsets
+    first = pd.to_datetime(pd.DataFrame({'year': months // 12, 'month': months % 12 + 1, 'day': 1}))
+    day = np.minimum(dates.dt.day.to_numpy(), first.dt.days_in_month.to_numpy())
+    return first + pd.to_timedelta(day - 1, unit='D')
+
+def shift_month_end_to_next_month(dates: pd.Series) -> pd.Series:
+    # Compras no último dia do mês entram na fatura do mês seguinte (dia 1)
+    dates = dates.dt.normalize()
+    return dates.where(~dates.dt.is_month_end, dates + pd.offsets.MonthBegin(1))
+
+def expand_installments(base: pd.DataFrame, totals: np.ndarray) -> pd.DataFrame:
+    # Repete cada compra parcelada "total" vezes e desloca a data mês a mês
+    positions = np.repeat(np.arange(len(base)), totals)
+    offsets = np.arange(len(positions)) - np.repeat(np.cumsum(totals) - totals, totals)
+    expanded = base.iloc[positions].reset_index(drop=True)
+    numbers = pd.Series(offsets + 1).astype(str)
+    totals_str = pd.Series(np.repeat(totals, totals)).astype(str)
+    parcela = numbers + '/' + totals_str
+    multi = pd.Series(np.repeat(totals > 1, totals))
+    dates = add_months(pd.Series(expanded['data'].to_numpy()), offsets)
+    base_description = expanded['descricao'].str.replace(_INSTALLMENT_SUFFIX, '', regex=True).str.strip()
+    expanded['data'] = dates.dt.strftime('%Y-%m-%d')
+    expanded['descricao'] = expanded['descricao'].where(~multi, base_description + ' (' + parcela + ')')
+    expanded['parcela'] = parcela.where(multi)
+    return expanded
+
+
+# --- Fatura do cartão de crédito ---
+def parse_fatura(df: pd.DataFrame, index, classifier, near=False) -> ImportResult:
+    if df.empty:
+        return ImportResult()
+    datas = parse_br_dates(df['data'])
+    descricoes = df['lançamento'].str.strip()
+    valores = parse_br_amounts(df['valor'])
+
+    reasons = pd.Series(None, index=df.index, dtype=object)
+    reasons[descricoes.eq('')] = 'descrição vazia'
+    reasons[valores.isna()] = 'valor inválido'
+    reasons[datas.isna()] = 'data inválida'
+    ok = reasons.isna()
+    result = ImportResult(rejected=_rejected_rows(df, reasons))
+    if not ok.any():
+        return result
+
+    rows = df.loc[ok]
+    base = pd.DataFrame({
+        "tipo": "Despesa", "categoria": CARD_CATEGORY,
+        "subcategoria": classifier.classify_series(rows['lançamento']),
+        "recorrente": False, "data": shift_month_end_to_next_month(datas[ok]),
+        "descricao": descricoes[ok], "valor": valores[ok],
+    }, index=rows.index)
+    expanded = expand_installments(base, parse_installment_totals(rows['parcela']))
+
+    keep = _drop_known_keys(expanded['data'], expanded['descricao'], expanded['valor'], index, near)
+    result.duplicates = int((~keep).sum())
+    expanded = expanded[keep].copy()
+    expanded['id'] = _new_ids(len(expanded))
+    records = expanded.to_dict('records')
+    for record in records:
+        # Compras à vista não levam o campo "parcela"
+        if not isinstance(record['parcela'], str): del record['parcela']
+    result.records = records
+    return result
+
+
+# --- Importação em lotes (memória limitada) ---
+def _file_size(file):
+    position = file.tell()
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+def stream_import(file, parse, index, commit, chunksize=IMPORT_CHUNK_ROWS, progress=None, lock=None) -> ImportResult:
+    # Lê, classifica e deduplica o CSV em blocos de "chunksize" linhas, gravando
+    # cada bloco com commit(records). Só um bloco fica em memória por vez; o
+    # relatório guarda no máximo MAX_REJECTED_ROWS linhas recusadas.
+    # commit deve manter o índice atualizado (store.add faz isso via notificação).
+    # lock (ex.: store.exclusive) torna a deduplicação e a gravação de cada bloco
+    # atômicas quando outras importações rodam ao mesmo tempo.
+    size = _file_size(file) or 1
+    summary = ImportResult()
+    rejected = []
+    rejected_rows = 0
+    for chunk in iter_statement_chunks(file, chunksize):
+        with (lock or nullcontext)():
+            result = parse(chunk, index)
+            if result.records: commit(result.records)
+        if result.records:
+            summary.added += len(result.records)
+        summary.duplicates += result.duplicates
+        if not result.rejected.empty and rejected_rows < MAX_REJECTED_ROWS:
+            rejected.append(result.rejected.head(MAX_REJECTED_ROWS - rejected_rows))
+            rejected_rows += len(rejected[-1])
+        if progress is not None:
+            progress(min(file.tell() / size, 1.0))
+    if rejected:
+        summary.rejected = pd.concat(rejected, ignore_index=True)
+    return summary
+
+def detect_statement_kind(columns):
+    # "fatura" tem a coluna parcela; "extrato" tem recorrente/categoria
+    if FATURA_REQUIRED_COLS.issubset(columns): return "fatura"
+    if EXTRATO_REQUIRED_COLS.issubset(columns): return "extrato"
+    return None
+
+def merge_import_results(results, index, near=False) -> list:
+    # Junta os lançamentos de vários arquivos, descartando o que já existe no
+    # índice e o que se repete entre os arquivos (vale a primeira ocorrência)
+    records = [t for result in results for t in result.records]
+    if not records: return []
+    keep = _drop_known_keys([t['data'] for t in records], [t['descricao'] for t in records],
+                            [t['valor'] for t in records], index, near)
+    return [t for t, kept in zip(records, keep) if kept]
@@ -0,0 +1,50 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+
+def transactions_frame(transactions) -> pd.DataFrame:
+    df = pd.DataFrame(transactions)
+    if df.empty: return df
+    df['data'] = pd.to_datetime(df['data'])
+    return df
+
+def recurring_mask(df: pd.DataFrame) -> pd.Series:
+    # Transações sem o campo "recorrente" (ex.: receitas manuais) não se repetem
+    if 'recorrente' not in df: return pd.Series(False, index=df.index)
+    return df['recorrente'].fillna(False).astype(bool)
+
+def expand_recurring_for_year(df_recurring: pd.DataFrame, year: int) -> pd.DataFrame:
+    # Produto cartesiano (transação x 12 meses), mantendo só os meses a partir
+    # do início de cada recorrência e limitando o dia ao tamanho do mês
+    starts = df_recurring['data']
+    positions = np.repeat(np.arange(len(df_recurring)), 12)
+    months = np.tile(np.arange(1, 13), len(df_recurring))
+    start_year = starts.dt.year.to_numpy()[positions]
+    start_month = starts.dt.month.to_numpy()[positions]
+    keep = (start_year < year) | (months >= start_month)
+    positions, months = positions[keep], months[keep]
+
+    days_in_month = np.array([calendar.monthrange(year, m)[1] for m in range(1, 13)])
+    days = np.minimum(starts.dt.day.to_numpy()[positions], days_in_month[months - 1])
+    expanded = df_recurring.iloc[positions].copy()
+    expanded['data'] = pd.to_datetime(pd.DataFrame({'year': year, 'month': months, 'day': days})).to_numpy()
+    expanded['original_id'] = expanded['id']
+    return expanded
+
+def expand_transactions_for_year(df_completo: pd.DataFrame, selected_year: int) -> pd.DataFrame:
+    if df_completo.empty: return pd.DataFrame()
+    recurring = recurring_mask(df_completo)
+    years = df_completo['data'].dt.year
+    df_single = df_completo[~recurring & (years == selected_year)]
+    df_recurring = df_completo[recurring & (years <= selected_year)]
+    if df_single.empty and df_recurring.empty: return pd.DataFrame()
+
+    parts = [df_single]
+    if not df_recurring.empty:
+        parts.append(expand_recurring_for_year(df_recurring, selected_year))
+    # Mantém a ordem original das transações (as repetições ficam no lugar da recorrente)
+    df_display = pd.concat(parts).sort_index(kind='stable').reset_index(drop=True)
+    df_display["mes"] = df_display["data"].dt.month
+    return df_display
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_LOG_FILE = "profiling.log"
+
+
+class RerunProfiler:
+    # Mede o tempo de cada etapa nomeada de uma execução do script e guarda
+    # contadores (linhas processadas, acerto/erro de cache). Desligado, não
+    # mede nada e não grava nada.
+
+    def __init__(self, enabled=False, log_path=PROFILE_LOG_FILE, session=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.session = session
+        self.stages = []
+        self.counters = {}
+        self._open = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        # Etapas podem ser aninhadas: cada uma guarda a etapa que a contém e o
+        # resumo mostra o tempo próprio (sem as internas), para não somar duas vezes
+        if not self.enabled:
+            yield
+            return
+        parent = self._open[-1] if self._open else None
+        self._open.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open.pop()
+            self.stages.append((name, time.perf_counter() - start, parent))
+
+    def record(self, name, value):
+        if self.enabled:
+            self.counters[name] = value
+
+    def summary(self):
+        children = {}
+        for _, seconds, parent in self.stages:
+            if parent is not None: children[parent] = children.get(parent, 0.0) + seconds
+        return {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "sessao": self.session,
+            "total_s": round(time.perf_counter() - self._started, 6),
+            "etapas": [{"etapa": name, "dentro_de": parent, "segundos": round(seconds, 6),
+                        "proprio_s": round(seconds - children.get(name, 0.0), 6)}
+                       for name, seconds, parent in self.stages],
+            "contadores": self.counters,
+        }
+
+    def finish(self):
+        # Anexa o resumo como uma linha JSON no log, para análise offline
+        if not self.enabled: return None
+        summary = self.summary()
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False, default=str) + "\n")
+        return summary
+
+
+def profiling_enabled_by_default():
+    return os.environ.get("FINANCE_PROFILE", "").lower() in ("1", "true", "sim")
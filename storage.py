@@ -0,0 +1,715 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+
+from dedup import DedupIndex, record_keys
+from processing import transactions_frame
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # backend Parquet é opcional
+    pa = pc = pq = None
+
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+DEDUP_DELTA_MIN = 10_000
+
+
+# --- Funções de Persistência de Dados (Salvar/Carregar) ---
+def save_data(filepath, data):
+    # Escrita atômica: grava num arquivo temporário e substitui o original
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+def load_data(filepath):
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return {} if "subcategories" in filepath else []
+    return {} if "subcategories" in filepath else []
+
+
+# --- Concorrência entre sessões ---
+class ReadWriteLock:
+    # Vários leitores ao mesmo tempo ou um único escritor. O escritor pode
+    # reentrar e também ler (listeners, compactação); um leitor não pode
+    # passar a escritor sem antes liberar a leitura.
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+
+    @contextmanager
+    def read(self):
+        if self._writer == threading.get_ident():
+            yield
+            return
+        with self._cond:
+            while self._writer is not None: self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers: self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                while self._writer is not None or self._readers: self._cond.wait()
+                self._writer, self._depth = me, 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+def _reads(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+def _writes(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        if self.read_only:
+            raise PermissionError("store aberto somente para leitura")
+        with self.exclusive():
+            return method(self, *args, **kwargs)
+    return locked
+
+@contextmanager
+def file_lock(path):
+    # Trava entre processos (ex.: o app e a CLI agendada no cron) via flock
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class JsonDocument:
+    # Arquivo JSON pequeno (categorias, regras) compartilhado entre sessões.
+    # As alterações são serializadas e trocam o valor inteiro (cópia na escrita),
+    # então quem está lendo nunca vê uma lista pela metade.
+
+    def __init__(self, filepath, default, save_default=False):
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self.value = load_data(filepath)
+        if not self.value:
+            self.value = default
+            if save_default: save_data(filepath, default)
+
+    def update(self, change):
+        # change(valor_atual) devolve o novo valor, que é gravado de forma atômica
+        with self._lock:
+            value = change(self.value)
+            if value != self.value:
+                save_data(self.filepath, value)
+                self.value = value
+            return value
+
+
+# --- Base comum aos backends de transações ---
+class _BaseStore:
+
+    def __init__(self, read_only=False):
+        # Versão do conjunto de dados: muda a cada alteração e serve de chave de cache.
+        # O token distingue instâncias diferentes carregadas do mesmo arquivo.
+        self._token = uuid.uuid4().hex[:12]
+        # Um mesmo store pode ser compartilhado por várias sessões (threads)
+        self.lock = ReadWriteLock()
+        self._changes = 0
+        self._listeners = []
+        self._dedup = None
+        self._file_locked = 0
+        # Somente leitura (simulação da CLI): nada é gravado, nem a trava, a
+        # compactação, a migração ou o índice de deduplicação
+        self.read_only = read_only
+
+    @property
+    def version(self):
+        return f"{self._token}:{self._changes}"
+
+    def subscribe(self, listener):
+        # listener(op, records) é chamado após cada alteração: ("add", novos),
+        # ("delete", removidos) ou ("clear", [])
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners: self._listeners.remove(listener)
+
+    def _notify(self, op, records):
+        for listener in self._listeners:
+            listener(op, records)
+
+    def is_empty(self):
+        return not self.transactions
+
+    # --- Sincronização com outros processos ---
+    @contextmanager
+    def exclusive(self):
+        # Trava de escrita desta instância e do arquivo. Ao entrar, incorpora o
+        # que outro processo tenha gravado; assim nenhuma gravação parte de uma
+        # cópia desatualizada (e a compactação não apaga o trabalho alheio).
+        with self.lock.write():
+            if self._file_locked or self.read_only:
+                yield
+                return
+            with file_lock(self._lock_path()):
+                self._file_locked += 1
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    self._file_locked -= 1
+                    self._mark_synced()
+
+    def refresh(self):
+        # Chamado a cada execução do app: só trava e relê se os arquivos mudaram
+        if self._disk_state() == self._synced_state: return
+        with self.exclusive():
+            pass
+
+    def _reload_notify(self, records):
+        # Recarga completa: os assinantes recomeçam do zero com o novo conteúdo
+        self._changes += 1
+        self._notify("clear", [])
+        if records: self._notify("add", records)
+
+    @_reads
+    def available_years(self):
+        df = self.frame()
+        if df.empty: return []
+        return sorted(set(df['data'].dt.year), reverse=True)
+
+    def year_frame(self, year):
+        # Transações necessárias para montar um ano: as do próprio ano e as
+        # recorrentes iniciadas até ele (o filtro fino fica com a expansão)
+        return self.frame()
+
+    # --- Índice de deduplicação ---
+    def dedup_index(self, near=False):
+        # Carregado do disco (snapshot + delta) quando corresponde aos dados
+        # atuais; senão é reconstruído e salvo. A partir daí acompanha cada
+        # alteração do store.
+        with self.exclusive():
+            if self._dedup is None:
+                index = DedupIndex.load(self._dedup_path(), self._signature(), self._row_count())
+                if index is None:
+                    index = DedupIndex.from_records(self._dedup_source())
+                    if not self.read_only: index.save(self._dedup_path(), self._signature())
+                self._dedup = index
+                self.subscribe(index.on_change)
+            if near:
+                self._dedup.enable_near(self._dedup_source())
+            return self._dedup
+
+    def _dedup_source(self):
+        return self.transactions
+
+    def _row_count(self):
+        return len(self.transactions)
+
+    def _log_dedup(self, op, records):
+        # Cada gravação só anexa as chaves alteradas ao delta do índice salvo; o
+        # snapshot é regravado quando o delta fica comparável ao próprio índice
+        path = self._dedup_path()
+        if op == "clear":
+            (self._dedup or DedupIndex()).save(path, self._signature())
+            return
+        keys = record_keys(records)
+        DedupIndex.append_delta(path, added=keys if op == "add" else (), removed=keys if op == "delete" else ())
+        if self._dedup is not None and DedupIndex.delta_entries(path) > max(DEDUP_DELTA_MIN, len(self._dedup)):
+            self._dedup.save(path, self._signature())
+
+    @staticmethod
+    def _stat(path):
+        if not os.path.exists(path): return None
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+
+# --- Armazenamento incremental de transações ---
+class TransactionStore(_BaseStore):
+    # O arquivo JSON continua sendo o "snapshot" no formato de sempre. Cada
+    # alteração é apenas anexada ao diário (<arquivo>.journal), uma linha por
+    # operação, e o snapshot é reescrito (compactação) só quando o diário cresce.
+    #
+    # A reaplicação do diário é idempotente por id: se o processo cair entre a
+    # gravação do snapshot e o truncamento do diário, o estado final é o mesmo.
+
+    def __init__(self, filepath, compact_min=1000, read_only=False):
+        super().__init__(read_only)
+        self.filepath = filepath
+        self.journal_path = filepath + JOURNAL_SUFFIX
+        self.compact_min = compact_min
+        self.transactions = []
+        self._ids = set()
+        self._journal_records = 0
+        self._frame = None
+        self._synced_state = None
+        if read_only:
+            self._load()
+            self._mark_synced()
+            return
+        with self.exclusive():  # carrega (e compacta, se preciso) sob a trava do arquivo
+            pass
+
+    @_reads
+    def frame(self):
+        # DataFrame com as datas já convertidas, reconstruído só quando os dados mudam
+        if self._frame is None or self._frame[0] != self.version:
+            self._frame = (self.version, transactions_frame(self.transactions))
+        return self._frame[1]
+
+    def _dedup_path(self):
+        return self.filepath + ".dedup.npz"
+
+    def _signature(self):
+        # O índice salvo vale para este snapshot; o que entrou pelo diário desde
+        # então está no delta
+        return [self._stat(self.filepath)]
+
+    # --- Carga e sincronização ---
+    def _lock_path(self):
+        return self.filepath + LOCK_SUFFIX
+
+    def _disk_state(self):
+        journal = self._stat(self.journal_path)
+        return self._stat(self.filepath), journal[1] if journal else 0
+
+    def _mark_synced(self):
+        self._synced_state = self._disk_state()
+
+    def _sync(self):
+        # Outro processo só anexou ao diário: reaplica as linhas novas. Se
+        # reescreveu o snapshot (compactação) ou truncou o diário: recarga completa.
+        state = self._disk_state()
+        if state == self._synced_state: return
+        if self._synced_state is None:
+            self._load()
+        elif state[0] != self._synced_state[0] or state[1] < self._synced_state[1]:
+            self.transactions = []
+            self._ids = set()
+            self._journal_records = 0
+            self._load()
+            self._reload_notify(self.transactions)
+        else:
+            entries, truncated = self._read_journal(self._synced_state[1])
+            for entry in entries:
+                affected = self._apply(entry, replay=True)
+                self._journal_records += len(entry.get("records", entry.get("ids", ()))) or 1
+                self._changes += 1
+                self._notify(entry["op"], affected)
+            if truncated:
+                self.compact()  # a posição sincronizada fica sempre num fim de linha
+        self._mark_synced()
+
+    def _read_journal(self, offset=0):
+        # Entradas completas a partir de "offset" bytes; truncated indica uma
+        # linha cortada por uma queda durante a escrita. Só essa linha é
+        # descartada: as entradas gravadas depois dela continuam valendo.
+        entries, truncated = [], False
+        if not os.path.exists(self.journal_path): return entries, truncated
+        with open(self.journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    truncated = True  # última linha sem fim: escrita ainda incompleta
+                    break
+                try:
+                    entries.append(json.loads(line.decode("utf-8")))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    truncated = True
+        return entries, truncated
+
+    def _load(self):
+        base = load_data(self.filepath)
+        needs_compaction = False
+        for t in base:
+            if 'id' not in t:
+                t['id'] = str(uuid.uuid4())
+                needs_compaction = True
+        self.transactions.extend(base)
+        self._ids.update(t['id'] for t in base)
+
+        entries, truncated = self._read_journal()
+        for entry in entries:
+            self._apply(entry, replay=True)
+            self._journal_records += len(entry.get("records", entry.get("ids", ()))) or 1
+        needs_compaction = needs_compaction or truncated
+
+        if needs_compaction and not self.read_only:
+            self.compact()
+
+    def _apply(self, entry, replay=False):
+        # Devolve os registros afetados (incluídos ou removidos)
+        op = entry.get("op")
+        if op == "add":
+            records = entry["records"]
+            if replay:
+                records = [t for t in records if t['id'] not in self._ids]
+            self.transactions.extend(records)
+            self._ids.update(t['id'] for t in records)
+            return records
+        elif op == "delete":
+            ids = set(entry["ids"]) & self._ids
+            if not ids: return []
+            removed = [t for t in self.transactions if t['id'] in ids]
+            self.transactions[:] = [t for t in self.transactions if t['id'] not in ids]
+            self._ids -= ids
+            return removed
+        elif op == "clear":
+            self.transactions.clear()
+            self._ids.clear()
+        return []
+
+    # --- Escrita ---
+    def _append_journal(self, entry):
+        # Chamado com a trava do arquivo. Se uma escrita anterior foi cortada,
+        # corta o diário de volta ao último "\n" para a nova entrada não se
+        # juntar à linha incompleta.
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    f.seek(0)
+                    f.truncate(f.read().rfind(b"\n") + 1)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _commit(self, entry, size):
+        self._append_journal(entry)
+        affected = self._apply(entry)
+        self._changes += 1
+        self._journal_records += size
+        self._notify(entry["op"], affected)
+        self._log_dedup(entry["op"], affected)
+        if self._journal_records >= max(self.compact_min, len(self.transactions) // 2):
+            self.compact()
+
+    @_writes
+    def add(self, records):
+        records = list(records)
+        if not records: return []
+        for t in records:
+            if 'id' not in t: t['id'] = str(uuid.uuid4())
+        self._commit({"op": "add", "records": records}, len(records))
+        return records
+
+    @_writes
+    def delete(self, ids):
+        ids = [i for i in dict.fromkeys(ids) if i in self._ids]
+        if not ids: return 0
+        self._commit({"op": "delete", "ids": ids}, len(ids))
+        return len(ids)
+
+    @_writes
+    def clear(self):
+        self.transactions.clear()
+        self._ids.clear()
+        self._changes += 1
+        self._notify("clear", [])
+        self.compact()
+
+    @_writes
+    def compact(self):
+        index = self.dedup_index()  # carregado enquanto a assinatura ainda é a do snapshot antigo
+        save_data(self.filepath, self.transactions)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_records = 0
+        index.save(self._dedup_path(), self._signature())
+
+    @_reads
+    def export_json(self, filepath):
+        save_data(filepath, self.transactions)
+
+
+# --- Backend colunar (Parquet) particionado por ano ---
+class ParquetTransactionStore(_BaseStore):
+    # Um arquivo Parquet por ano (ano=AAAA.parquet) e um para as recorrentes,
+    # que valem para todos os anos seguintes. Abrir o dashboard de um ano lê só
+    # a partição dele e a das recorrentes, com leitura mapeada em memória.
+    # Cada gravação reescreve apenas as partições afetadas, de forma atômica.
+
+    RECURRING_PARTITION = "recorrentes"
+    MIGRATION_MARKER = "migrado_do_json"
+
+    def __init__(self, directory, seed_json=None, read_only=False):
+        if pq is None:
+            raise ImportError("O backend Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+        super().__init__(read_only)
+        self.directory = directory
+        self._cache = {}
+        self._id_partitions = None
+        self._synced_state = None
+        if read_only:
+            self._mark_synced()
+            return
+        os.makedirs(directory, exist_ok=True)
+        marker = os.path.join(directory, self.MIGRATION_MARKER)
+        with self.exclusive():
+            if seed_json and not os.path.exists(marker):
+                # Primeira abertura: migra o JSON existente (snapshot + diário). O
+                # marcador impede que o JSON volte depois de "Limpar Todos os Dados".
+                if not self._partitions() and os.path.exists(seed_json):
+                    self._write_records(TransactionStore(seed_json).transactions)
+                with open(marker, "w", encoding="utf-8") as f:
+                    f.write(os.path.abspath(seed_json) + "\n")
+
+    # --- Sincronização com outros processos ---
+    def _lock_path(self):
+        return os.path.join(self.directory, LOCK_SUFFIX)
+
+    def _disk_state(self):
+        return [[p, self._stat(self._path(p))] for p in self._partitions()]
+
+    def _mark_synced(self):
+        self._synced_state = self._disk_state()
+
+    def _sync(self):
+        # Alguma partição mudou fora deste processo: descarta os caches e avisa
+        # os assinantes com o conteúdo novo
+        if self._disk_state() == self._synced_state: return
+        reload = self._synced_state is not None
+        self._cache.clear()
+        self._id_partitions = None
+        self._mark_synced()
+        if reload: self._reload_notify(self.transactions)
+
+    # --- Partições ---
+    def _path(self, partition):
+        return os.path.join(self.directory, f"{partition}.parquet")
+
+    def _partitions(self):
+        names = [f[:-len(".parquet")] for f in os.listdir(self.directory) if f.endswith(".parquet")]
+        return sorted(n for n in names if n == self.RECURRING_PARTITION or n.startswith("ano="))
+
+    def _partition_of(self, records):
+        # Nome da partição de cada registro: recorrentes à parte, demais por ano
+        years = pd.to_datetime(pd.Series([t['data'] for t in records])).dt.year
+        return [self.RECURRING_PARTITION if t.get('recorrente') else f"ano={year}"
+                for t, year in zip(records, years)]
+
+    def _read(self, partition):
+        # Leitores concorrentes podem preencher o cache ao mesmo tempo; por isso
+        # o valor é devolvido direto, sem reler o dicionário
+        key = (self.version, partition)
+        cache = self._cache
+        if key in cache: return cache[key]
+        path = self._path(partition)
+        table = pq.read_table(path, memory_map=True) if os.path.exists(path) else None
+        self._cache = {k: v for k, v in list(cache.items()) if k[0] == self.version}
+        self._cache[key] = table
+        return table
+
+    def _write(self, partition, table):
+        self._cache.clear()
+        path = self._path(partition)
+        if table is None or table.num_rows == 0:
+            if os.path.exists(path): os.remove(path)
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".parquet", dir=self.directory)
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _table_of(rows):
+        # from_pylist só usa as chaves do primeiro registro; aqui as colunas são a
+        # união das chaves de todos (chave ausente vira nulo)
+        columns = list(dict.fromkeys(key for t in rows for key in t))
+        return pa.Table.from_pydict({key: [t.get(key) for t in rows] for key in columns})
+
+    def _write_records(self, records):
+        grouped = {}
+        for partition, t in zip(self._partition_of(records), records):
+            grouped.setdefault(partition, []).append(t)
+        for partition, rows in grouped.items():
+            current = self._read(partition)
+            table = self._table_of(rows)
+            if current is not None:
+                table = pa.concat_tables([current, table], promote_options="permissive")
+            self._write(partition, table)
+            if self._id_partitions is not None:
+                self._id_partitions.update((t['id'], partition) for t in rows)
+
+    # --- Leitura ---
+    def _frame_of(self, partitions):
+        tables = [t for t in (self._read(p) for p in partitions) if t is not None]
+        if not tables: return pd.DataFrame()
+        table = pa.concat_tables(tables, promote_options="permissive")
+        return transactions_frame(table.to_pandas())
+
+    @property
+    @_reads
+    def transactions(self):
+        key = (self.version, "*list")
+        records = self._cache.get(key)
+        if records is None:
+            records = []
+            for partition in self._partitions():
+                records.extend(self._read(partition).to_pylist())
+            self._cache[key] = records
+        return records
+
+    @_reads
+    def frame(self):
+        return self._frame_of(self._partitions())
+
+    @_reads
+    def is_empty(self):
+        return not self._partitions()
+
+    @_reads
+    def available_years(self):
+        # Anos vêm do nome das partições; só a partição de recorrentes é lida
+        years = {int(p[len("ano="):]) for p in self._partitions() if p.startswith("ano=")}
+        recurring = self._read(self.RECURRING_PARTITION)
+        if recurring is not None:
+            dates = pd.to_datetime(recurring.column('data').to_pandas())
+            years.update(dates.dt.year)
+        return sorted(years, reverse=True)
+
+    @_reads
+    def year_frame(self, year):
+        key = (self.version, f"year={year}")
+        df = self._cache.get(key)
+        if df is None:
+            df = self._cache[key] = self._frame_of([f"ano={year}", self.RECURRING_PARTITION])
+        return df
+
+    # --- Índice de deduplicação ---
+    def _dedup_path(self):
+        return os.path.join(self.directory, "dedup.npz")
+
+    def _signature(self):
+        # As partições mudam a cada gravação; a validade do índice salvo fica com
+        # a geração do delta e com o total de linhas
+        return []
+
+    def _row_count(self):
+        return sum(pq.read_metadata(self._path(p)).num_rows for p in self._partitions())
+
+    def _dedup_source(self):
+        # Só as colunas usadas na chave são lidas
+        records = []
+        for partition in self._partitions():
+            table = pq.read_table(self._path(partition), columns=['data', 'descricao', 'valor'], memory_map=True)
+            records.extend(table.to_pylist())
+        return records
+
+    # --- Escrita ---
+    def _locate(self, ids):
+        if self._id_partitions is None:
+            # Só a coluna "id" de cada partição é lida para montar o índice
+            self._id_partitions = {}
+            for partition in self._partitions():
+                column = pq.read_table(self._path(partition), columns=['id'], memory_map=True).column('id')
+                self._id_partitions.update((i, partition) for i in column.to_pylist())
+        return {i: self._id_partitions[i] for i in ids if i in self._id_partitions}
+
+    @_writes
+    def add(self, records):
+        records = list(records)
+        if not records: return []
+        for t in records:
+            if 'id' not in t: t['id'] = str(uuid.uuid4())
+        self._write_records(records)
+        self._changes += 1
+        self._notify("add", records)
+        self._log_dedup("add", records)
+        return records
+
+    @_writes
+    def delete(self, ids):
+        located = self._locate(dict.fromkeys(ids))
+        if not located: return 0
+        removed = []
+        for partition in set(located.values()):
+            table = self._read(partition)
+            drop = pa.array([i in located for i in table.column('id').to_pylist()])
+            removed.extend(table.filter(drop).to_pylist())
+            self._write(partition, table.filter(pc.invert(drop)))
+        for i in located: del self._id_partitions[i]
+        self._changes += 1
+        self._notify("delete", removed)
+        self._log_dedup("delete", removed)
+        return len(located)
+
+    @_writes
+    def clear(self):
+        for partition in self._partitions():
+            os.remove(self._path(partition))
+        self._id_partitions = {}
+        self._changes += 1
+        self._notify("clear", [])
+        self._log_dedup("clear", [])
+
+    @_reads
+    def export_json(self, filepath):
+        save_data(filepath, self.transactions)
+
+
+def open_store(filepath, backend=None, read_only=False):
+    # FINANCE_STORAGE=parquet ativa o backend colunar; o padrão continua sendo o JSON
+    backend = backend or os.environ.get("FINANCE_STORAGE", "json")
+    if backend == "parquet":
+        directory = os.path.splitext(filepath)[0] + "_parquet"
+        migrated = os.path.exists(os.path.join(directory, ParquetTransactionStore.MIGRATION_MARKER))
+        if read_only and not migrated and not glob.glob(os.path.join(directory, "*.parquet")):
+            # Ainda não migrado: o conteúdo é o do JSON, lido sem migrar
+            return TransactionStore(filepath, read_only=True)
+        return ParquetTransactionStore(directory, seed_json=filepath, read_only=read_only)
+    return TransactionStore(filepath, read_only=read_only)
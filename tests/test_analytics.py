@@ -0,0 +1,42 @@
+import pytest
+
+from aggregates import AggregateCube
+from analytics import RangeAnalytics
+from benchmarks.synthetic import generate_transactions
+from processing import transactions_frame
+from storage import TransactionStore, save_data
+
+
+@pytest.fixture(scope="module")
+def df():
+    return transactions_frame(generate_transactions(3000))
+
+
+def test_monthly_balance_matches_cube(tmp_path, df):
+    path = str(tmp_path / "finance_data.json")
+    save_data(path, generate_transactions(3000))
+    cube = AggregateCube(TransactionStore(path))
+    years = sorted(set(df['data'].dt.year))
+    balance = RangeAnalytics(df, f"{years[0]}-01-01", f"{years[-1]}-12-31").monthly_balance()
+    for year in years:
+        monthly = cube.monthly_by_type(year).reindex(range(1, 13), fill_value=0)
+        expected = balance[balance.index.year == year][["Receita", "Despesa"]].to_numpy()
+        assert expected == pytest.approx(monthly[["Receita", "Despesa"]].to_numpy())
+
+
+def test_net_worth_includes_history_before_range(df):
+    years = sorted(set(df['data'].dt.year))
+    full = RangeAnalytics(df, f"{years[0]}-01-01", f"{years[-1]}-12-31").net_worth()
+    narrow = RangeAnalytics(df, f"{years[-3]}-01-01", f"{years[-1]}-12-31").net_worth()
+    assert narrow.to_numpy() == pytest.approx(full.loc[narrow.index].to_numpy())
+
+
+def test_opening_balance_counts_active_recurring():
+    df = transactions_frame([
+        {"id": "a", "data": "2022-11-10", "descricao": "Aluguel", "valor": 100.0, "tipo": "Despesa", "recorrente": True},
+        {"id": "b", "data": "2022-12-05", "descricao": "Salario", "valor": 500.0, "tipo": "Receita"},
+        {"id": "c", "data": "2023-01-05", "descricao": "Mercado", "valor": 30.0, "tipo": "Despesa", "recorrente": False},
+    ])
+    analytics = RangeAnalytics(df, "2023-01-01", "2023-02-28")
+    assert analytics.opening_balance == pytest.approx(500.0 - 2 * 100.0)
+    assert list(analytics.net_worth()) == pytest.approx([300.0 - 100.0 - 30.0, 300.0 - 130.0 - 100.0])
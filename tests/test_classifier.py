@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from classifier import SubcategoryClassifier, clean_merchant_name
+
+RULES = {"AMAZON": "Varejo Online", "AMAZON PRIME": "Assinaturas", "UBER": "Transporte",
+         "UBER EATS": "Alimentação", "POSTO": "Combustível", "PIZZA": "Restaurantes", "PIZZ": "Lanches"}
+
+
+def get_subcategory(merchant_name, rules):
+    # Versão original: palavras-chave da mais longa para a mais curta (sort estável)
+    if not rules: return 'Diversos'
+    cleaned_name = clean_merchant_name(merchant_name)
+    for keyword in sorted(rules.keys(), key=len, reverse=True):
+        if keyword in cleaned_name:
+            return rules[keyword]
+    return 'Diversos'
+
+
+def test_longest_keyword_wins():
+    classifier = SubcategoryClassifier(RULES)
+    assert classifier.classify("PG *AMAZON PRIME BR") == "Assinaturas"
+    assert classifier.classify("AMAZON MARKETPLACE") == "Varejo Online"
+    assert classifier.classify("UBER *UBER EATS") == "Alimentação"
+    assert classifier.classify("PIZZARIA") == "Restaurantes"
+    assert classifier.classify("PADARIA") == "Diversos"
+
+
+def test_tie_goes_to_first_keyword_in_file():
+    assert SubcategoryClassifier({"POSTO": "A", "UBER": "B", "SHELL": "C"}).classify("SHELL POSTO") == "A"
+    assert SubcategoryClassifier({"SHELL": "C", "POSTO": "A"}).classify("SHELL POSTO") == "C"
+
+
+def test_empty_keyword_is_the_fallback():
+    classifier = SubcategoryClassifier({"": "Sem regra", "UBER": "Transporte"})
+    assert classifier.classify("UBER TRIP") == "Transporte"
+    assert classifier.classify("PADARIA") == "Sem regra"
+    assert classifier.classify(None) == "Sem regra"
+    assert SubcategoryClassifier({}).classify("UBER") == "Diversos"
+
+
+def test_classify_series_accepts_non_strings():
+    names = pd.Series(["UBER TRIP", None, np.nan, 42, "uber trip", "AMAZON"], index=list("abcdef"))
+    for rules in (RULES, {"": "Sem regra", **RULES}):
+        result = SubcategoryClassifier(rules).classify_series(names)
+        assert list(result.index) == list(names.index)
+        assert result.tolist() == [get_subcategory(name, rules) for name in names]
+
+
+def test_matches_original_on_random_names():
+    rng = np.random.default_rng(0)
+    alphabet = np.array(list("ABPUZ E*"))
+    keywords = ["".join(rng.choice(alphabet[:5], rng.integers(0, 4))) for _ in range(30)]
+    rules = {k: f"S{i}" for i, k in enumerate(keywords)}
+    classifier = SubcategoryClassifier(rules)
+    for _ in range(2000):
+        name = "".join(rng.choice(alphabet, rng.integers(0, 12)))
+        assert classifier.classify(name) == get_subcategory(name, rules), name
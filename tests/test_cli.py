@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import cli
+from storage import pq, save_data
+
+HISTORY = [{"id": "h1", "data": "2024-01-05", "descricao": "PG *AMAZON", "valor": 50.0, "tipo": "Despesa",
+            "categoria": "Lazer", "recorrente": False}]
+EXTRATO = ("data;lançamento;categoria;valor;recorrente\n"
+           "05/01/2024;PG *AMAZON;Lazer;-50,00;false\n"
+           "06/01/2024;MERCADO;Alimentação;-80,00;false\n")
+
+
+def _listing(directory):
+    return {os.path.relpath(os.path.join(root, f), directory): os.stat(os.path.join(root, f)).st_mtime_ns
+            for root, _, files in os.walk(directory) for f in files}
+
+
+@pytest.mark.parametrize("backend", ["json", pytest.param("parquet", marks=pytest.mark.skipif(
+    pq is None, reason="backend Parquet requer pyarrow"))])
+def test_simulate_writes_nothing(tmp_path, capsys, backend):
+    data = tmp_path / "dados"
+    data.mkdir()
+    json_path = str(data / "finance_data.json")
+    save_data(json_path, HISTORY)
+    with open(json_path + ".journal", "ab") as f:
+        f.write(b'{"op": "add", "rec')  # linha cortada: abrir para gravar compactaria
+    csv_path = tmp_path / "extrato.csv"
+    csv_path.write_text(EXTRATO, encoding="utf-8")
+    before = _listing(data)
+
+    args = [str(csv_path), "--dados", json_path, "--backend", backend, "--processos", "1", "--simular"]
+    assert cli.main(args) == 0
+    assert "1 novo(s) lançamento(s) seriam adicionados (1 já existentes)" in capsys.readouterr().out
+    assert _listing(data) == before
@@ -0,0 +1,58 @@
+import io
+from functools import partial
+
+import pandas as pd
+import pytest
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+from exporters import EXPORT_FORMATS, available_formats, export_file
+from storage import TransactionStore
+
+RECORDS = [
+    {"id": "a", "data": "2023-03-05", "descricao": "PG *AMAZON", "valor": 50.0, "tipo": "Despesa",
+     "categoria": "Cartão de Crédito", "subcategoria": "Varejo Online", "recorrente": False},
+    {"id": "b", "data": "2024-01-31", "descricao": "Aluguel", "valor": 1000.0, "tipo": "Despesa",
+     "categoria": "Moradia", "recorrente": True},
+    {"id": "c", "data": "2024-02-05", "descricao": "Salario", "valor": 5000.0, "tipo": "Receita", "categoria": "N/A"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TransactionStore(str(tmp_path / "finance_data.json"))
+    store.add([dict(t) for t in RECORDS])
+    return store
+
+
+def run_deferred(callable_, fmt):
+    # Mesmo caminho do st.download_button com data=callable ao clicar no botão
+    storage = MemoryMediaFileStorage("/media")
+    manager = MediaFileManager(storage)
+    file_name, mime = EXPORT_FORMATS[fmt]
+    file_id = manager.add_deferred(callable_, mime, "coordenadas", file_name=file_name)
+    url = manager.execute_deferred(file_id)
+    return storage.get_file(url.rsplit("/", 1)[-1].split(".")[0]).content
+
+
+@pytest.mark.parametrize("fmt", available_formats())
+def test_download_button_callable(store, fmt):
+    content = run_deferred(partial(export_file, store, fmt, years=[], start=None, end=None,
+                                   tipos=["Receita", "Despesa"]), fmt)
+    if fmt == "CSV":
+        df = pd.read_csv(io.BytesIO(content), sep=';')
+    else:
+        df = pd.read_parquet(io.BytesIO(content))
+    assert sorted(df['id']) == ["a", "b", "c"]
+
+
+def test_csv_matches_full_history(store):
+    expected = pd.DataFrame(store.transactions).to_csv(index=False, sep=';').encode('utf-8')
+    assert export_file(store, "CSV", chunk_rows=1).read() == expected
+
+
+def test_filters(store):
+    df = pd.read_csv(export_file(store, "CSV", years=[2024], tipos=["Despesa"]), sep=';')
+    assert list(df['id']) == ["b"]
+    df = pd.read_csv(export_file(store, "CSV", start="2023-01-01", end="2024-01-31"), sep=';')
+    assert list(df['id']) == ["a", "b"]
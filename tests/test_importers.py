@@ -0,0 +1,72 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from classifier import SubcategoryClassifier
+from dedup import DedupIndex, dedup_key
+from importers import generate_installments, parse_extrato, parse_fatura
+
+HISTORY = [{"data": "2024-01-05", "descricao": "PG *AMAZON", "valor": 50.0}]
+
+
+def extrato(rows):
+    return pd.DataFrame(rows, columns=['data', 'lançamento', 'categoria', 'valor', 'recorrente'])
+
+
+def test_dedup_key_normalizes_columns():
+    assert dedup_key("2024-01-05", "  pg   *amazon ", 50) == dedup_key("2024-01-05 00:00:00", "PG *AMAZON", 50.001)
+    assert dedup_key("2024-01-05", "PG *AMAZON", 50) != dedup_key("2024-01-06", "PG *AMAZON", 50)
+
+
+def test_parse_extrato_drops_known_and_repeated_rows():
+    df = extrato([
+        ["05/01/2024", "PG *AMAZON", "Lazer", "-50,00", "false"],      # já no histórico
+        ["06/01/2024", "MERCADO", "Alimentação", "-80,00", "false"],
+        ["06/01/2024", "mercado ", "Alimentação", "-80,00", "false"],  # repetido no arquivo
+        ["07/01/2024", "SALARIO", "", "5.000,00", "false"],
+    ])
+    result = parse_extrato(df, DedupIndex.from_records(HISTORY))
+    assert [t['descricao'] for t in result.records] == ["MERCADO", "SALARIO"]
+    assert result.duplicates == 2
+
+
+def test_parse_extrato_near_duplicates():
+    index = DedupIndex.from_records(HISTORY)
+    index.enable_near(HISTORY)
+    df = extrato([["05/01/2024", "PG *AMAZON BR", "Lazer", "-50,00", "false"]])
+    assert parse_extrato(df, index).records
+    assert not parse_extrato(df, index, near=True).records
+
+
+def test_parse_fatura_matches_generate_installments():
+    # A expansão vetorizada tem de gerar as mesmas datas, descrições e parcelas
+    # que a versão linha a linha (generate_installments)
+    rng = np.random.default_rng(0)
+    parcelas = ["", "1", "2", "3/12", "1/2/3", "x/4", " 2/6 ", "0", "/3", "12"]
+    dias = ["31/01/2024", "30/01/2024", "29/02/2024", "30/04/2024", "15/03/2024", "31/12/2023", "28/02/2023",
+            "29/10/2023", "31/08/2024"]
+    rows = []
+    for i in range(400):
+        data = str(rng.choice(dias + ["32/01/2024"]))
+        valor = "abc" if i % 97 == 0 else f"{rng.integers(1, 5000)},{rng.integers(0, 100):02d}"
+        rows.append([data, f"LOJA {i} 2/5" if i % 3 == 0 else f"LOJA {i}", valor, str(rng.choice(parcelas))])
+    df = pd.DataFrame(rows, columns=['data', 'lançamento', 'valor', 'parcela'])
+
+    expected = []
+    for data, descricao, valor, parcela in rows:
+        try:
+            valor = float(valor.replace('.', '').replace(',', '.'))
+            purchase_date = pd.to_datetime(data, dayfirst=True, format="%d/%m/%Y")
+        except ValueError:
+            continue
+        if purchase_date.day == calendar.monthrange(purchase_date.year, purchase_date.month)[1]:
+            purchase_date = (purchase_date + pd.DateOffset(months=1)).replace(day=1)
+        for t in generate_installments({"data": purchase_date, "descricao": descricao.strip(),
+                                        "valor": valor, "parcela": parcela.strip()}):
+            expected.append((t['data'], t['descricao'], t.get('parcela'), t['valor']))
+
+    result = parse_fatura(df, DedupIndex(), SubcategoryClassifier({}))
+    got = [(t['data'], t['descricao'], t.get('parcela'), t['valor']) for t in result.records]
+    assert len(got) > len(rows)
+    assert got == expected
@@ -0,0 +1,157 @@
+import os
+
+import pytest
+
+from storage import TransactionStore, open_store, pq, save_data
+
+needs_pyarrow = pytest.mark.skipif(pq is None, reason="backend Parquet requer pyarrow")
+BACKENDS = ["json", pytest.param("parquet", marks=needs_pyarrow)]
+
+RECORDS = [
+    {"id": "r1", "data": "2024-02-05", "descricao": "Salario", "valor": 5000.0, "tipo": "Receita", "categoria": "N/A"},
+    {"id": "d1", "data": "2024-03-05", "descricao": "PG *AMAZON", "valor": 50.0, "tipo": "Despesa",
+     "categoria": "Cartão de Crédito", "subcategoria": "Varejo Online", "recorrente": False},
+    {"id": "d2", "data": "2024-01-31", "descricao": "Aluguel", "valor": 1000.0, "tipo": "Despesa",
+     "categoria": "Moradia", "recorrente": True},
+]
+FATURA = [
+    {"id": "f1", "data": "2024-04-10", "descricao": "MERCADO", "valor": 80.0, "tipo": "Despesa",
+     "categoria": "Cartão de Crédito", "subcategoria": "Alimentação", "recorrente": False},
+    {"id": "f2", "data": "2024-04-10", "descricao": "LOJA 1/2", "valor": 30.0, "tipo": "Despesa",
+     "categoria": "Cartão de Crédito", "subcategoria": "Diversos", "recorrente": False, "parcela": "1/2"},
+    {"id": "f3", "data": "2024-05-10", "descricao": "LOJA 2/2", "valor": 30.0, "tipo": "Despesa",
+     "categoria": "Cartão de Crédito", "subcategoria": "Diversos", "recorrente": False, "parcela": "2/2"},
+]
+
+
+def _by_id(records):
+    # O Parquet devolve chaves ausentes como None
+    return {t['id']: {k: v for k, v in t.items() if v is not None} for t in records}
+
+
+@needs_pyarrow
+def test_parquet_round_trip_keeps_every_key(tmp_path):
+    json_path = str(tmp_path / "finance_data.json")
+    save_data(json_path, RECORDS)
+    store = open_store(json_path, backend="parquet")
+    assert _by_id(store.transactions) == _by_id(RECORDS)
+
+    store.add([dict(t) for t in FATURA])
+    assert _by_id(store.transactions) == _by_id(RECORDS + FATURA)
+    reopened = open_store(json_path, backend="parquet")
+    assert _by_id(reopened.transactions) == _by_id(RECORDS + FATURA)
+
+
+def test_json_round_trip(tmp_path):
+    path = str(tmp_path / "finance_data.json")
+    store = TransactionStore(path, compact_min=2)
+    store.add([dict(t) for t in RECORDS])
+    store.add([dict(t) for t in FATURA])
+    store.delete(["d1"])
+    expected = _by_id(RECORDS + FATURA)
+    del expected["d1"]
+    assert _by_id(TransactionStore(path).transactions) == expected
+
+
+@needs_pyarrow
+@pytest.mark.parametrize("empty", ["clear", "delete"])
+def test_parquet_migrates_json_only_once(tmp_path, empty):
+    json_path = str(tmp_path / "finance_data.json")
+    save_data(json_path, RECORDS)
+    store = open_store(json_path, backend="parquet")
+    if empty == "clear": store.clear()
+    else: store.delete([t['id'] for t in RECORDS])
+    assert open_store(json_path, backend="parquet").transactions == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_writes_from_another_process_survive(tmp_path, backend):
+    # "app" e "cli" são duas instâncias do mesmo arquivo, como dois processos
+    json_path = str(tmp_path / "finance_data.json")
+    app = open_store(json_path, backend)
+    if backend == "json": app.compact_min = 2
+    app.add([dict(RECORDS[0])])
+    cli = open_store(json_path, backend)
+    cli.add([dict(FATURA[0])])
+    for t in RECORDS[1:] + FATURA[1:]:
+        app.add([dict(t)])  # com compact_min=2, compacta no meio
+    expected = _by_id(RECORDS + FATURA)
+    assert _by_id(app.transactions) == expected
+    assert _by_id(open_store(json_path, backend).transactions) == expected
+
+
+def test_refresh_picks_up_external_writes(tmp_path):
+    json_path = str(tmp_path / "finance_data.json")
+    app = TransactionStore(json_path)
+    index = app.dedup_index()
+    seen = []
+    app.subscribe(lambda op, records: seen.append((op, len(records))))
+    TransactionStore(json_path).add([dict(t) for t in RECORDS])
+    version = app.version
+    app.refresh()
+    assert app.version != version and seen == [("add", len(RECORDS))]
+    assert len(app.transactions) == len(RECORDS) and len(index) == len(RECORDS)
+    TransactionStore(json_path).compact()
+    app.refresh()
+    assert [op for op, _ in seen[1:]] == ["clear", "add"] and len(index) == len(RECORDS)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dedup_index_persists_as_snapshot_plus_delta(tmp_path, monkeypatch, backend):
+    from dedup import DedupIndex
+    json_path = str(tmp_path / "finance_data.json")
+    save_data(json_path, RECORDS)
+    store = open_store(json_path, backend)
+    store.dedup_index()
+    snapshot = store._dedup_path()
+    saved = os.stat(snapshot).st_mtime_ns
+    store.add([dict(t) for t in FATURA])
+    store.delete(["r1"])
+    assert os.stat(snapshot).st_mtime_ns == saved  # só o delta cresceu
+
+    expected = DedupIndex.from_records(open_store(json_path, backend).transactions)
+    def rebuild(records):
+        raise AssertionError("o índice salvo deveria ter sido reaproveitado")
+    monkeypatch.setattr(DedupIndex, "from_records", classmethod(lambda cls, records: rebuild(records)))
+    reloaded = open_store(json_path, backend).dedup_index()
+    assert reloaded._counts == expected._counts
+
+
+def test_dedup_index_rebuilt_when_delta_is_stale(tmp_path):
+    json_path = str(tmp_path / "finance_data.json")
+    store = TransactionStore(json_path)
+    store.add([dict(t) for t in RECORDS])
+    store.dedup_index()
+    os.remove(store._dedup_path() + ".delta")
+    store.add([dict(t) for t in FATURA])
+    assert len(TransactionStore(json_path).dedup_index()) == len(RECORDS) + len(FATURA)
+
+
+def test_truncated_journal_line_keeps_later_writes(tmp_path):
+    # Uma escrita cortada no meio (queda de outro processo) não pode levar
+    # junto as entradas gravadas depois dela
+    path = str(tmp_path / "finance_data.json")
+    store = TransactionStore(path)
+    store.add([dict(RECORDS[0])])
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"op": "add", "records": [{"id": "x", "da')
+    store.add([dict(RECORDS[1])])
+    store.add([dict(RECORDS[2])])
+    expected = _by_id(RECORDS)
+    assert _by_id(store.transactions) == expected
+    assert _by_id(TransactionStore(path).transactions) == expected
+    assert _by_id(TransactionStore(path).transactions) == expected  # e a compactação não perdeu nada
+
+
+def test_unterminated_journal_tail_is_dropped_on_refresh(tmp_path):
+    path = str(tmp_path / "finance_data.json")
+    app = TransactionStore(path)
+    cli = TransactionStore(path)
+    cli.add([dict(RECORDS[0])])
+    with open(cli.journal_path, "ab") as f:
+        f.write(b'{"op": "add", "rec')
+    app.refresh()
+    cli.add([dict(RECORDS[1])])
+    app.refresh()
+    assert _by_id(app.transactions) == _by_id(RECORDS[:2])
+    assert _by_id(TransactionStore(path).transactions) == _by_id(RECORDS[:2])